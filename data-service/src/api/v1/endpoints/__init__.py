@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
 from fastapi import Depends
 from pydantic import BaseModel
@@ -17,3 +17,10 @@ class Pagination(BaseModel):
 
 
 PaginationDependancy = Annotated[Pagination, Depends()]
+
+
+class CursorPagination(Pagination):
+    cursor: Optional[str] = None
+
+
+CursorPaginationDependancy = Annotated[CursorPagination, Depends()]
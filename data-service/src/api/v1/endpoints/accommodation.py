@@ -1,19 +1,34 @@
+from operator import attrgetter, itemgetter
 from typing import Optional, Union
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 
-from src.core.db import AsyncSessionDependency
+from src.core.db import AsyncSessionDependency, get_async_session_context
+from src.core.exceptions import InvalidCursorError, InvalidFieldsError
 from src.schemas.accommodation import AccommodationOut, ExpandedAccommodationOut
-from src.schemas.review import ReviewOut
+from src.schemas.review import ReviewAggregatesOut, ReviewOut
+from src.schemas.score import AccommodationScoreOut
 from src.services.accommodation import AccommodationServiceDependency
 from src.services.review import ReviewServiceDependancy
+from src.services.score import AccommodationScoreServiceDependency
+from src.utils.cursor import decode_cursor, encode_cursor
+from src.utils.fields import get_fields_adapter, parse_fields
 
-from . import ERROR_RESPONSE, PaginationDependancy
-from .filters import AccommodationFiltersDependency
+from . import ERROR_RESPONSE, CursorPaginationDependancy, PaginationDependancy
+from .filters import (
+    AccommodationFiltersDependency,
+    ReviewAggregatesFiltersDependency,
+    ReviewFieldsDependency,
+    ReviewMonthBucketsFiltersDependency,
+)
 
 router = APIRouter()
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 
 @router.get(
     "/{accommodation_id}",
@@ -47,23 +62,126 @@ async def get_accommodations(
     return await accommodation_service.get_accommodations(session, **pagination.model_dump())
 
 
+@router.get(
+    "/{accommodation_id}/score",
+    response_model=AccommodationScoreOut,
+    responses={status.HTTP_404_NOT_FOUND: ERROR_RESPONSE},
+)
+async def get_accommodation_score(
+    accommodation_id: UUID,
+    score_service: AccommodationScoreServiceDependency,
+    session: AsyncSessionDependency,
+) -> AccommodationScoreOut:
+    score = await score_service.get_score(accommodation_id, session)
+    if score is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            f"Score of accommodation with id={accommodation_id} was not found",
+        )
+
+    return score
+
+
 @router.get(
     "/{accommodation_id}/reviews",
     response_model=list[ReviewOut],
-    responses={status.HTTP_404_NOT_FOUND: ERROR_RESPONSE},
+    responses={status.HTTP_400_BAD_REQUEST: ERROR_RESPONSE, status.HTTP_404_NOT_FOUND: ERROR_RESPONSE},
+    summary=(
+        f"reviews ordered by creation date, if page is full {NEXT_CURSOR_HEADER} header contains next page cursor, "
+        "only columns of fields are read if they are provided"
+    ),
 )
 async def get_accommodation_reviews(
     accommodation_id: UUID,
-    pagination: PaginationDependancy,
+    response: Response,
+    pagination: CursorPaginationDependancy,
     accommodation_filters: AccommodationFiltersDependency,
+    review_fields: ReviewFieldsDependency,
+    review_service: ReviewServiceDependancy,
+    session: AsyncSessionDependency,
+) -> Union[list[ReviewOut], Response]:
+    try:
+        after = decode_cursor(pagination.cursor) if pagination.cursor is not None else None
+        fields = parse_fields(review_fields.fields, ReviewOut) if review_fields.fields is not None else None
+    except (InvalidCursorError, InvalidFieldsError) as error:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(error))
+
+    args = (accommodation_id, session)
+    kwargs = dict(**pagination.model_dump(exclude={"cursor"}), **accommodation_filters.model_dump(), after=after)
+    if fields is None:
+        reviews = await review_service.get_reviews_by_accommodation(*args, **kwargs)
+        result, get_cursor_keys = reviews, attrgetter("created_at", "id")
+    else:
+        # response_model is skipped for the returned response, so it is serialized by a model of the fields
+        reviews = await review_service.get_review_fields_by_accommodation(*args, fields, **kwargs)
+        fields_adapter = get_fields_adapter(ReviewOut, fields)
+        result = response = Response(
+            fields_adapter.dump_json(fields_adapter.validate_python(reviews)), media_type="application/json"
+        )
+        get_cursor_keys = itemgetter("created_at", "id")
+
+    if reviews and len(reviews) == pagination.limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*get_cursor_keys(reviews[-1]))
+    return result
+
+
+@router.get(
+    "/{accommodation_id}/reviews/stream",
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+    summary="all reviews ordered by creation date as newline delimited json",
+)
+async def stream_accommodation_reviews(
+    accommodation_id: UUID,
+    accommodation_filters: AccommodationFiltersDependency,
+    review_service: ReviewServiceDependancy,
+) -> StreamingResponse:
+    async def reviews_lines():
+        # dependencies are closed before the body is sent, so the stream owns its session
+        async with get_async_session_context() as session:
+            async for review in review_service.stream_reviews_by_accommodation(
+                accommodation_id,
+                session,
+                **accommodation_filters.model_dump(),
+            ):
+                yield ReviewOut.model_validate(review, from_attributes=True).model_dump_json() + "\n"
+
+    return StreamingResponse(reviews_lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get(
+    "/{accommodation_id}/reviews/aggregates",
+    response_model=ReviewAggregatesOut,
+    summary="sum and count of reviews older than 2 years and of newer reviews grouped by age in months",
+)
+async def get_accommodation_review_aggregates(
+    accommodation_id: UUID,
+    aggregates_filters: ReviewAggregatesFiltersDependency,
+    review_service: ReviewServiceDependancy,
+    session: AsyncSessionDependency,
+) -> ReviewAggregatesOut:
+    return await review_service.get_review_aggregates_by_accommodation(
+        accommodation_id,
+        session,
+        **aggregates_filters.model_dump(),
+    )
+
+
+@router.get(
+    "/{accommodation_id}/reviews/buckets",
+    response_model=ReviewAggregatesOut,
+    summary="sum and count of reviews per calendar month of the last 2 years and of older reviews",
+)
+async def get_accommodation_review_month_buckets(
+    accommodation_id: UUID,
+    buckets_filters: ReviewMonthBucketsFiltersDependency,
     review_service: ReviewServiceDependancy,
     session: AsyncSessionDependency,
-) -> list[ReviewOut]:
-    return await review_service.get_reviews_by_accommodation(
+) -> ReviewAggregatesOut:
+    return await review_service.get_review_month_buckets_by_accommodation(
         accommodation_id,
         session,
-        **pagination.model_dump(),
-        **accommodation_filters.model_dump(),
+        **buckets_filters.model_dump(),
     )
 
 
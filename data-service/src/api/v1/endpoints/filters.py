@@ -1,7 +1,8 @@
+from datetime import date
 from typing import Annotated, Optional
 
 from fastapi import Depends
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from src.repositories.review import TimeFrame
 from src.schemas.review import ReviewStatus
@@ -13,3 +14,25 @@ class AccommodationFilters(BaseModel):
 
 
 AccommodationFiltersDependency = Annotated[AccommodationFilters, Depends()]
+
+
+class ReviewAggregatesFilters(BaseModel):
+    status: Optional[ReviewStatus] = None
+    score_aspect: Optional[str] = None
+
+
+ReviewAggregatesFiltersDependency = Annotated[ReviewAggregatesFilters, Depends()]
+
+
+class ReviewFields(BaseModel):
+    fields: Optional[str] = Field(None, description="comma separated fields of the review, all fields if not provided")
+
+
+ReviewFieldsDependency = Annotated[ReviewFields, Depends()]
+
+
+class ReviewMonthBucketsFilters(ReviewAggregatesFilters):
+    as_of: Optional[date] = None
+
+
+ReviewMonthBucketsFiltersDependency = Annotated[ReviewMonthBucketsFilters, Depends()]
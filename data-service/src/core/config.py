@@ -11,6 +11,11 @@ class Settings(BaseSettings):
     TEST_DATABASE_DSN: PostgresDsn
     ECHO_ENABLED: bool = False
 
+    SCORE_REFRESH_ENABLED: bool = True
+    SCORE_REFRESH_INTERVAL: int = 60
+    SCORE_REFRESH_BATCH_SIZE: int = 100
+    SCORE_REFRESH_MAX_AGE: int = 60 * 60 * 24
+
     @property
     def DATABASE_URL(self):
         return str(self.DATABASE_DSN)
@@ -1,4 +1,5 @@
-from typing import Annotated, Generator
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncIterator, Generator
 
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
@@ -14,7 +15,8 @@ def get_async_session_maker(engine: AsyncEngine) -> async_sessionmaker[AsyncSess
     return async_sessionmaker(engine, expire_on_commit=False)
 
 
-async def get_async_session() -> Generator[AsyncSession, None, None]:
+@asynccontextmanager
+async def get_async_session_context() -> AsyncIterator[AsyncSession]:
     engine = get_async_engine(settings.DATABASE_URL)
     async_session = get_async_session_maker(engine)
 
@@ -22,4 +24,9 @@ async def get_async_session() -> Generator[AsyncSession, None, None]:
         yield session
 
 
+async def get_async_session() -> Generator[AsyncSession, None, None]:
+    async with get_async_session_context() as session:
+        yield session
+
+
 AsyncSessionDependency = Annotated[AsyncSession, Depends(get_async_session)]
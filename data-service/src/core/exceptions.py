@@ -1,2 +1,10 @@
 class DateTimeWithoutTimezoneError(Exception):
     pass
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+class InvalidFieldsError(Exception):
+    pass
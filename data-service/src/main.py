@@ -1,11 +1,30 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
 import uvicorn
 from fastapi import FastAPI
 
 from src.api.v1.routers import router as main_router_v1
+from src.core.config import settings
+from src.services.score import run_score_refresh
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if not settings.SCORE_REFRESH_ENABLED:
+        yield
+        return
+
+    score_refresh = asyncio.create_task(run_score_refresh())
+    yield
+    score_refresh.cancel()
+    with suppress(asyncio.CancelledError):
+        await score_refresh
 
 
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
     app.include_router(main_router_v1)
     return app
 
@@ -17,8 +17,13 @@ from .accommodation import (  # noqa
 from .review import (  # noqa
     Locale,
     Review,
+    ReviewMonthBucket,
     Source,
 )
+from .score import (  # noqa
+    AccommodationScore,
+    AccommodationScoreDirty,
+)
 from .user import (  # noqa
     User,
 )
@@ -0,0 +1,48 @@
+"""review changed notify
+
+Revision ID: 05
+Revises: 04
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "05"
+down_revision: Union[str, None] = "04"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Sends the accommodation id of every changed review to the review_changed channel on commit,
+# identical notifications of one transaction are delivered once.
+TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION review_changed_notify_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.accommodation_id IS NOT NULL THEN
+        PERFORM pg_notify('review_changed', OLD.accommodation_id::text);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.accommodation_id IS NOT NULL THEN
+        PERFORM pg_notify('review_changed', NEW.accommodation_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGER = """
+CREATE TRIGGER review_changed_notify
+AFTER INSERT OR UPDATE OR DELETE ON review
+FOR EACH ROW EXECUTE FUNCTION review_changed_notify_trigger();
+"""
+
+
+def upgrade() -> None:
+    op.execute(TRIGGER_FUNCTION)
+    op.execute(TRIGGER)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS review_changed_notify ON review;")
+    op.execute("DROP FUNCTION IF EXISTS review_changed_notify_trigger();")
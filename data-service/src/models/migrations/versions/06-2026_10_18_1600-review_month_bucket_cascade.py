@@ -0,0 +1,59 @@
+"""review month bucket cascade
+
+Revision ID: 06
+Revises: 05
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "06"
+down_revision: Union[str, None] = "05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Bucket function of 03 with reviews deleted by the accommodation cascade skipped,
+# otherwise their buckets are inserted for the accommodation being deleted and violate the foreign key.
+APPLY_FUNCTION = """
+CREATE OR REPLACE FUNCTION review_month_bucket_apply(r review, sign integer) RETURNS void AS $$
+BEGIN
+    INSERT INTO review_month_bucket (id, accommodation_id, status, score_aspect, month, sum, count)
+    SELECT
+        gen_random_uuid(),
+        r.accommodation_id,
+        r.status,
+        scores.score_aspect,
+        date_trunc('month', r.created_at AT TIME ZONE 'UTC')::date,
+        sign * scores.score,
+        sign
+    FROM (
+        SELECT 'general_score' AS score_aspect, r.general_score AS score
+        UNION ALL
+        SELECT key, value::text::double precision
+        FROM json_each(r.score_aspects)
+        WHERE json_typeof(value) = 'number'
+    ) AS scores
+    WHERE EXISTS (SELECT 1 FROM accommodation WHERE id = r.accommodation_id)
+    ON CONFLICT (accommodation_id, status, score_aspect, month) DO UPDATE
+    SET sum = review_month_bucket.sum + EXCLUDED.sum,
+        count = review_month_bucket.count + EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Bucket function as created by 03.
+PREVIOUS_APPLY_FUNCTION = APPLY_FUNCTION.replace(
+    "WHERE EXISTS (SELECT 1 FROM accommodation WHERE id = r.accommodation_id)",
+    "WHERE r.accommodation_id IS NOT NULL",
+)
+
+
+def upgrade() -> None:
+    op.execute(APPLY_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_APPLY_FUNCTION)
@@ -1,8 +1,8 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import TYPE_CHECKING, Optional
 from uuid import UUID
 
-from sqlalchemy import JSON, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID as POSTGRES_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -22,9 +22,19 @@ LOCALE_CODE_LEN = 5
 SOURCE_NAME_LEN = 64
 SCORE_ASPECT__NAME_LEN = 64
 
+GENERAL_SCORE_BUCKET = "general_score"
+
 
 class Review(Base):
     __tablename__ = "review"
+    __table_args__ = (
+        Index(
+            "ix_review_accommodation_id_created_at_id",
+            "accommodation_id",
+            "created_at",
+            "id",
+        ),
+    )
 
     title: Mapped[Optional[str]] = mapped_column(
         String(REVIEW_TITLE_LEN),
@@ -108,6 +118,55 @@ class Review(Base):
         return f"Review(id={self.id} title={self.title:.20s})"
 
 
+class ReviewMonthBucket(Base):
+    """
+    Sum and count of review scores per accommodation, status, score aspect and calendar month (UTC).
+    Maintained by the review_month_bucket trigger, general score is stored as GENERAL_SCORE_BUCKET aspect.
+    """
+
+    __tablename__ = "review_month_bucket"
+    __table_args__ = (
+        UniqueConstraint(
+            "accommodation_id",
+            "status",
+            "score_aspect",
+            "month",
+            name="uq_review_month_bucket",
+        ),
+    )
+
+    accommodation_id: Mapped[UUID] = mapped_column(
+        POSTGRES_UUID,
+        ForeignKey("accommodation.id", ondelete=CASCADE),
+        nullable=False,
+    )
+    status: Mapped[str] = mapped_column(
+        String(REVIEW_STATUS_LEN),
+        nullable=False,
+    )
+    score_aspect: Mapped[str] = mapped_column(
+        String(SCORE_ASPECT__NAME_LEN),
+        nullable=False,
+    )
+    month: Mapped[date] = mapped_column(
+        Date,
+        nullable=False,
+    )
+    sum: Mapped[float] = mapped_column(
+        Float,
+        default=0,
+        nullable=False,
+    )
+    count: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        nullable=False,
+    )
+
+    def __repr__(self):
+        return f"ReviewMonthBucket(accommodation_id={self.accommodation_id} month={self.month})"
+
+
 class Locale(Base):
     __tablename__ = "locale"
 
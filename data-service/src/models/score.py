@@ -0,0 +1,57 @@
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import JSON, DateTime, Float, ForeignKey, func
+from sqlalchemy.dialects.postgresql import UUID as POSTGRES_UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import CASCADE, Base
+
+
+class AccommodationScore(Base):
+    """Scores of an accommodation, id is the accommodation id."""
+
+    __tablename__ = "accommodation_score"
+
+    id: Mapped[UUID] = mapped_column(
+        POSTGRES_UUID,
+        ForeignKey("accommodation.id", ondelete=CASCADE),
+        primary_key=True,
+    )
+    general_score: Mapped[float] = mapped_column(
+        Float,
+        nullable=False,
+    )
+    score_aspects: Mapped[dict] = mapped_column(
+        JSON,
+        default={},
+        nullable=False,
+    )
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=datetime.utcnow,
+        nullable=False,
+    )
+
+    def __repr__(self):
+        return f"AccommodationScore(id={self.id} general_score={self.general_score})"
+
+
+class AccommodationScoreDirty(Base):
+    """Accommodations whose reviews changed since their score was computed, filled by a trigger on review."""
+
+    __tablename__ = "accommodation_score_dirty"
+
+    id: Mapped[UUID] = mapped_column(
+        POSTGRES_UUID,
+        ForeignKey("accommodation.id", ondelete=CASCADE),
+        primary_key=True,
+    )
+    marked_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+
+    def __repr__(self):
+        return f"AccommodationScoreDirty(id={self.id} marked_at={self.marked_at})"
@@ -26,7 +26,8 @@ class BaseRepository(AbstractRepository):
         offset: int = 0,
         limit: int = 1000,
     ) -> list[Base]:
-        objs = await session.scalars(select(self.model).offset(offset).limit(limit))
+        """Ordered by id, so offset pages don't skip or repeat objects."""
+        objs = await session.scalars(select(self.model).order_by(self.model.id).offset(offset).limit(limit))
         return objs.all()
 
     async def create(
@@ -1,13 +1,29 @@
-from datetime import datetime
+from collections import defaultdict
+from datetime import date, datetime, timezone
 from enum import Enum
 from functools import lru_cache
-from typing import Optional
+from typing import AsyncIterator, Optional
 from uuid import UUID
 
-from sqlalchemy import and_, select
+from sqlalchemy import (
+    Float,
+    Integer,
+    Select,
+    String,
+    Text,
+    and_,
+    case,
+    cast,
+    func,
+    null,
+    select,
+    true,
+    tuple_,
+    union_all,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.review import Locale, Review, Source
+from src.models.review import GENERAL_SCORE_BUCKET, Locale, Review, ReviewMonthBucket, Source
 
 from .base import BaseRepository
 
@@ -21,33 +37,269 @@ class ReviewRepository(BaseRepository):
     def __init__(self, model: Review):
         super().__init__(model)
 
-    async def get_reviews_by_accommodation(
+    @staticmethod
+    def get_two_years_ago(now: datetime) -> datetime:
+        return now.replace(year=now.year - 2)
+
+    @staticmethod
+    def get_score_column(score_aspect: Optional[str] = None):
+        if score_aspect is None:
+            return Review.general_score
+        return Review.score_aspects[score_aspect].as_float()
+
+    @staticmethod
+    def get_months_age(now: datetime, created_at):
+        """Age in whole months like relativedelta."""
+        age = func.age(func.timezone("UTC", now), func.timezone("UTC", created_at))
+        return cast(func.extract("year", age) * 12 + func.extract("month", age), Integer)
+
+    def _get_reviews_by_accommodation_query(
         self,
         accommodation_id: UUID,
-        session: AsyncSession,
         status: Optional[str] = None,
         time_frame: Optional[str] = None,
-        offset: int = 0,
-        limit: int = 1000,
-    ) -> list[Review]:
-        query = select(Review).where(Review.accommodation_id == accommodation_id)
+        fields: Optional[tuple[str, ...]] = None,
+    ) -> Select:
+        """Only columns of fields are selected if they are provided."""
+        columns = [Review] if fields is None else [getattr(Review, field) for field in fields]
+        query = select(*columns).where(Review.accommodation_id == accommodation_id)
         if status is not None:
             query = query.where(Review.status == status)
 
         if time_frame is not None:
-            two_years_ago = datetime.utcnow().replace(year=datetime.utcnow().year - 2)
+            two_years_ago = self.get_two_years_ago(datetime.utcnow())
             time_frame_mapper = {
                 TimeFrame.NEWER_THEN_TWO_YEARS: Review.created_at >= two_years_ago,
                 TimeFrame.OLDER_THEN_TWO_YEARS: Review.created_at < two_years_ago,
             }
             query = query.where(time_frame_mapper[time_frame])
 
-        query = query.offset(offset).limit(limit)
+        return query.order_by(Review.created_at, Review.id)
+
+    async def get_reviews_by_accommodation(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+        status: Optional[str] = None,
+        time_frame: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after: Optional[tuple[datetime, UUID]] = None,
+    ) -> list[Review]:
+        """Reviews ordered by (created_at, id), offset is ignored if after is provided."""
+        query = self._get_reviews_by_accommodation_query(accommodation_id, status, time_frame)
+        query = self._paginate_reviews_query(query, offset, limit, after)
 
         result = await session.execute(query)
         reviews = result.scalars().all()
         return reviews
 
+    async def get_review_fields_by_accommodation(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+        fields: tuple[str, ...],
+        status: Optional[str] = None,
+        time_frame: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after: Optional[tuple[datetime, UUID]] = None,
+    ) -> list[dict]:
+        """
+        Same as get_reviews_by_accommodation, but only fields are read from the table.
+        id and created_at are always included as pages are built from them.
+        """
+        fields = tuple(dict.fromkeys(("id", "created_at", *fields)))
+        query = self._get_reviews_by_accommodation_query(accommodation_id, status, time_frame, fields)
+        query = self._paginate_reviews_query(query, offset, limit, after)
+
+        result = await session.execute(query)
+        return [dict(review) for review in result.mappings()]
+
+    @staticmethod
+    def _paginate_reviews_query(
+        query: Select,
+        offset: int = 0,
+        limit: int = 1000,
+        after: Optional[tuple[datetime, UUID]] = None,
+    ) -> Select:
+        if after is not None:
+            query = query.where(tuple_(Review.created_at, Review.id) > after)
+        else:
+            query = query.offset(offset)
+        return query.limit(limit)
+
+    async def stream_reviews_by_accommodation(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+        status: Optional[str] = None,
+        time_frame: Optional[str] = None,
+        yield_per: int = 1000,
+    ) -> AsyncIterator[Review]:
+        """Reviews ordered by (created_at, id) fetched from a server side cursor by yield_per rows."""
+        query = self._get_reviews_by_accommodation_query(accommodation_id, status, time_frame)
+        reviews = await session.stream_scalars(query.execution_options(yield_per=yield_per))
+        async for review in reviews:
+            yield review
+
+    async def get_review_aggregates_by_accommodation(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+        status: Optional[str] = None,
+        score_aspect: Optional[str] = None,
+    ) -> dict:
+        """
+        Sum and count of reviews older than two years and per-month sums and counts
+        of newer reviews, where month is the review age computed like relativedelta.
+        """
+        now = datetime.now(timezone.utc)
+        two_years_ago = self.get_two_years_ago(now)
+        score = self.get_score_column(score_aspect)
+
+        filters = [Review.accommodation_id == accommodation_id, score.isnot(None)]
+        if status is not None:
+            filters.append(Review.status == status)
+
+        old_query = select(func.coalesce(func.sum(score), 0), func.count(score)).where(
+            *filters,
+            Review.created_at < two_years_ago,
+        )
+        old_sum, old_count = (await session.execute(old_query)).one()
+
+        new_reviews = (
+            select(
+                self.get_months_age(now, Review.created_at).label("months"),
+                score.label("score"),
+            )
+            .where(*filters, Review.created_at >= two_years_ago)
+            .subquery()
+        )
+        new_query = (
+            select(new_reviews.c.months, func.sum(new_reviews.c.score), func.count(new_reviews.c.score))
+            .group_by(new_reviews.c.months)
+            .order_by(new_reviews.c.months)
+        )
+        new_rows = (await session.execute(new_query)).all()
+
+        return {
+            "old": {"sum": old_sum, "count": old_count},
+            "new": [{"months": months, "sum": score_sum, "count": count} for months, score_sum, count in new_rows],
+        }
+
+    async def get_all_review_aggregates_by_accommodation(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+        status: Optional[str] = None,
+    ) -> dict[Optional[str], dict]:
+        """
+        get_review_aggregates_by_accommodation of the general score and of every score aspect in one query.
+        return: dict[score_aspect: aggregates], general score is None.
+        """
+        now = datetime.now(timezone.utc)
+        two_years_ago = self.get_two_years_ago(now)
+
+        filters = [Review.accommodation_id == accommodation_id]
+        if status is not None:
+            filters.append(Review.status == status)
+
+        score_aspects = func.json_each(Review.score_aspects).table_valued("key", "value")
+        scores = union_all(
+            select(
+                Review.created_at,
+                cast(null(), String).label("score_aspect"),
+                Review.general_score.label("score"),
+            ).where(*filters),
+            select(
+                Review.created_at,
+                score_aspects.c.key,
+                cast(cast(score_aspects.c.value, Text), Float),
+            )
+            .select_from(Review)
+            .join(score_aspects, true())
+            .where(*filters, func.json_typeof(score_aspects.c.value) == "number"),
+        ).subquery()
+        aged_scores = select(
+            scores.c.score_aspect,
+            case(
+                (scores.c.created_at < two_years_ago, null()),
+                else_=self.get_months_age(now, scores.c.created_at),
+            ).label("months"),
+            scores.c.score,
+        ).subquery()
+        query = select(
+            aged_scores.c.score_aspect,
+            aged_scores.c.months,
+            func.sum(aged_scores.c.score),
+            func.count(aged_scores.c.score),
+        ).group_by(aged_scores.c.score_aspect, aged_scores.c.months)
+        rows = (await session.execute(query)).all()
+
+        aggregates = defaultdict(lambda: {"old": {"sum": 0, "count": 0}, "new": []})
+        for score_aspect, months, score_sum, count in rows:
+            if months is None:
+                aggregates[score_aspect]["old"] = {"sum": score_sum, "count": count}
+            else:
+                aggregates[score_aspect]["new"].append({"months": months, "sum": score_sum, "count": count})
+        return dict(aggregates)
+
+    @staticmethod
+    def get_months_between(start: date, end: date) -> int:
+        months_in_year = 12
+        return (end.year - start.year) * months_in_year + end.month - start.month
+
+    async def get_review_month_buckets_by_accommodation(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+        status: Optional[str] = None,
+        score_aspect: Optional[str] = None,
+        as_of: Optional[date] = None,
+        new_months: int = 24,
+    ) -> dict:
+        """
+        Same shape as get_review_aggregates_by_accommodation read from review_month_bucket,
+        months is the calendar month age relative to as_of, buckets older than new_months are summed up.
+        """
+        if as_of is None:
+            as_of = datetime.now(timezone.utc).date()
+        as_of_month = as_of.replace(day=1)
+        first_new_month_index = as_of_month.year * 12 + as_of_month.month - 1 - (new_months - 1)
+        first_new_month = date(first_new_month_index // 12, first_new_month_index % 12 + 1, 1)
+
+        filters = [
+            ReviewMonthBucket.accommodation_id == accommodation_id,
+            ReviewMonthBucket.score_aspect == (GENERAL_SCORE_BUCKET if score_aspect is None else score_aspect),
+            ReviewMonthBucket.month <= as_of_month,
+        ]
+        if status is not None:
+            filters.append(ReviewMonthBucket.status == status)
+
+        old_query = select(
+            func.coalesce(func.sum(ReviewMonthBucket.sum), 0),
+            func.coalesce(func.sum(ReviewMonthBucket.count), 0),
+        ).where(*filters, ReviewMonthBucket.month < first_new_month)
+        old_sum, old_count = (await session.execute(old_query)).one()
+
+        new_query = (
+            select(ReviewMonthBucket.month, func.sum(ReviewMonthBucket.sum), func.sum(ReviewMonthBucket.count))
+            .where(*filters, ReviewMonthBucket.month >= first_new_month)
+            .group_by(ReviewMonthBucket.month)
+            .having(func.sum(ReviewMonthBucket.count) > 0)
+            .order_by(ReviewMonthBucket.month.desc())
+        )
+        new_rows = (await session.execute(new_query)).all()
+
+        return {
+            "old": {"sum": old_sum, "count": old_count},
+            "new": [
+                {"months": self.get_months_between(month, as_of_month), "sum": score_sum, "count": count}
+                for month, score_sum, count in new_rows
+            ],
+        }
+
     async def get_review_by_accommodation(
         self,
         accommodation_id: UUID,
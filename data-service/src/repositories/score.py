@@ -0,0 +1,67 @@
+from datetime import datetime
+from functools import lru_cache
+from uuid import UUID
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.accommodation import Accommodation
+from src.models.score import AccommodationScore, AccommodationScoreDirty
+
+from .base import BaseRepository
+
+
+class AccommodationScoreRepository(BaseRepository):
+    def __init__(self, model: AccommodationScore):
+        super().__init__(model)
+
+    async def upsert(
+        self,
+        accommodation_id: UUID,
+        general_score: float,
+        score_aspects: dict,
+        computed_at: datetime,
+        session: AsyncSession,
+    ) -> None:
+        values = {"general_score": general_score, "score_aspects": score_aspects, "computed_at": computed_at}
+        query = insert(AccommodationScore).values(id=accommodation_id, **values)
+        await session.execute(query.on_conflict_do_update(index_elements=[AccommodationScore.id], set_=values))
+
+    async def delete_by_id(self, accommodation_id: UUID, session: AsyncSession) -> None:
+        await session.execute(delete(AccommodationScore).where(AccommodationScore.id == accommodation_id))
+
+    async def mark_computed_before_dirty(self, computed_before: datetime, session: AsyncSession) -> None:
+        """Scores change as reviews get older, so outdated scores are recomputed even without new reviews."""
+        outdated_scores = select(AccommodationScore.id).where(AccommodationScore.computed_at < computed_before)
+        query = insert(AccommodationScoreDirty).from_select(["id"], outdated_scores)
+        await session.execute(query.on_conflict_do_nothing(index_elements=[AccommodationScoreDirty.id]))
+
+    async def claim_dirty(self, session: AsyncSession, limit: int = 100) -> list[UUID]:
+        """
+        Dirty accommodations are deleted and returned, rows locked by other workers are skipped.
+        Commit right away, review triggers writing the same rows wait for the lock.
+        """
+        dirty_ids = (
+            select(AccommodationScoreDirty.id)
+            .order_by(AccommodationScoreDirty.marked_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            delete(AccommodationScoreDirty)
+            .where(AccommodationScoreDirty.id.in_(dirty_ids))
+            .returning(AccommodationScoreDirty.id)
+        )
+        return (await session.scalars(query)).all()
+
+    async def mark_dirty(self, accommodation_ids: list[UUID], session: AsyncSession) -> None:
+        """Accommodations deleted in the meantime are skipped."""
+        existing_ids = select(Accommodation.id).where(Accommodation.id.in_(accommodation_ids))
+        query = insert(AccommodationScoreDirty).from_select(["id"], existing_ids)
+        await session.execute(query.on_conflict_do_nothing(index_elements=[AccommodationScoreDirty.id]))
+
+
+@lru_cache()
+def get_accommodation_score_repository() -> AccommodationScoreRepository:
+    return AccommodationScoreRepository(AccommodationScore)
@@ -84,6 +84,20 @@ class ReviewOut(BaseModel):
     zoover_review_id: int
 
 
+class OldReviewsAggregateOut(BaseModel):
+    sum: float
+    count: int
+
+
+class NewReviewsAggregateOut(OldReviewsAggregateOut):
+    months: int
+
+
+class ReviewAggregatesOut(BaseModel):
+    old: OldReviewsAggregateOut
+    new: list[NewReviewsAggregateOut]
+
+
 class LocaleIn(BaseModel):
     code: str = Field(..., alias="locale", max_length=LOCALE_CODE_LEN)
 
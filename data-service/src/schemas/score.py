@@ -0,0 +1,9 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class AccommodationScoreOut(BaseModel):
+    general_score: float
+    score_aspects: dict[str, float]
+    computed_at: datetime
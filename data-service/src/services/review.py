@@ -1,5 +1,6 @@
+from datetime import date, datetime
 from functools import lru_cache
-from typing import Annotated, Optional
+from typing import Annotated, AsyncIterator, Optional
 from uuid import UUID
 
 from fastapi import Depends
@@ -24,6 +25,7 @@ class ReviewService:
         time_frame: Optional[str] = None,
         offset: int = 0,
         limit: int = 1000,
+        after: Optional[tuple[datetime, UUID]] = None,
     ) -> list[Review]:
         return await self.review_repository.get_reviews_by_accommodation(
             accommodation_id,
@@ -32,6 +34,74 @@ class ReviewService:
             time_frame,
             offset,
             limit,
+            after,
+        )
+
+    async def get_review_fields_by_accommodation(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+        fields: tuple[str, ...],
+        status: Optional[str] = None,
+        time_frame: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after: Optional[tuple[datetime, UUID]] = None,
+    ) -> list[dict]:
+        return await self.review_repository.get_review_fields_by_accommodation(
+            accommodation_id,
+            session,
+            fields,
+            status,
+            time_frame,
+            offset,
+            limit,
+            after,
+        )
+
+    async def stream_reviews_by_accommodation(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+        status: Optional[str] = None,
+        time_frame: Optional[str] = None,
+    ) -> AsyncIterator[Review]:
+        async for review in self.review_repository.stream_reviews_by_accommodation(
+            accommodation_id,
+            session,
+            status,
+            time_frame,
+        ):
+            yield review
+
+    async def get_review_aggregates_by_accommodation(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+        status: Optional[str] = None,
+        score_aspect: Optional[str] = None,
+    ) -> dict:
+        return await self.review_repository.get_review_aggregates_by_accommodation(
+            accommodation_id,
+            session,
+            status,
+            score_aspect,
+        )
+
+    async def get_review_month_buckets_by_accommodation(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+        status: Optional[str] = None,
+        score_aspect: Optional[str] = None,
+        as_of: Optional[date] = None,
+    ) -> dict:
+        return await self.review_repository.get_review_month_buckets_by_accommodation(
+            accommodation_id,
+            session,
+            status,
+            score_aspect,
+            as_of,
         )
 
     async def get_review_by_accommodation(
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.db import get_async_engine, get_async_session_maker
+from src.models.score import AccommodationScore
+from src.repositories.review import ReviewRepository, get_review_repository
+from src.repositories.score import AccommodationScoreRepository, get_accommodation_score_repository
+from src.schemas.review import ReviewStatus
+from src.utils.score import compute_score
+
+
+class AccommodationScoreService:
+    def __init__(
+        self,
+        score_repository: AccommodationScoreRepository,
+        review_repository: ReviewRepository,
+    ) -> None:
+        self.score_repository = score_repository
+        self.review_repository = review_repository
+
+    async def get_score(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+    ) -> AccommodationScore:
+        return await self.score_repository.get_by_id(accommodation_id, session)
+
+    async def refresh_score(
+        self,
+        accommodation_id: UUID,
+        session: AsyncSession,
+    ) -> None:
+        """Score aspects without old reviews are omitted, the row is removed if general score can't be computed."""
+        aggregates = await self.review_repository.get_all_review_aggregates_by_accommodation(
+            accommodation_id,
+            session,
+            ReviewStatus.APPROVED,
+        )
+        general_score = compute_score(aggregates.pop(None)) if None in aggregates else None
+        if general_score is None:
+            await self.score_repository.delete_by_id(accommodation_id, session)
+            return
+
+        score_aspects = {}
+        for score_aspect, score_aspect_aggregates in aggregates.items():
+            score = compute_score(score_aspect_aggregates)
+            if score is not None:
+                score_aspects[score_aspect] = score
+        await self.score_repository.upsert(
+            accommodation_id,
+            general_score,
+            score_aspects,
+            datetime.now(timezone.utc),
+            session,
+        )
+
+    async def refresh_dirty_scores(
+        self,
+        session: AsyncSession,
+        batch_size: int = 100,
+        max_age: int = 60 * 60 * 24,
+    ) -> int:
+        """
+        Recompute scores of accommodations whose reviews changed and of scores older than max_age seconds.
+        Every batch is claimed in its own short transaction and computed without locks,
+        reviews changed meanwhile mark their accommodation dirty again.
+        Claimed accommodations are marked dirty again if computing the batch fails.
+        return: amount of refreshed accommodations.
+        """
+        await self.score_repository.mark_computed_before_dirty(
+            datetime.now(timezone.utc) - timedelta(seconds=max_age),
+            session,
+        )
+        await session.commit()
+
+        refreshed = 0
+        while accommodation_ids := await self.score_repository.claim_dirty(session, batch_size):
+            await session.commit()
+            try:
+                for accommodation_id in accommodation_ids:
+                    await self.refresh_score(accommodation_id, session)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                await self.score_repository.mark_dirty(accommodation_ids, session)
+                await session.commit()
+                raise
+            refreshed += len(accommodation_ids)
+        return refreshed
+
+
+@lru_cache
+def get_accommodation_score_service() -> AccommodationScoreService:
+    return AccommodationScoreService(get_accommodation_score_repository(), get_review_repository())
+
+
+AccommodationScoreServiceDependency = Annotated[AccommodationScoreService, Depends(get_accommodation_score_service)]
+
+
+async def run_score_refresh() -> None:
+    """Background job refreshing dirty scores every SCORE_REFRESH_INTERVAL seconds."""
+    score_service = get_accommodation_score_service()
+    engine = get_async_engine(settings.DATABASE_URL)
+    async_session = get_async_session_maker(engine)
+    try:
+        while True:
+            try:
+                async with async_session() as session:
+                    refreshed = await score_service.refresh_dirty_scores(
+                        session,
+                        settings.SCORE_REFRESH_BATCH_SIZE,
+                        settings.SCORE_REFRESH_MAX_AGE,
+                    )
+                if refreshed:
+                    logging.info("Refreshed scores of %s accommodations", refreshed)
+            except Exception:
+                logging.exception("Score refresh failed")
+            await asyncio.sleep(settings.SCORE_REFRESH_INTERVAL)
+    finally:
+        await engine.dispose()
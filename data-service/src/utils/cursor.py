@@ -0,0 +1,21 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from uuid import UUID
+
+from src.core.exceptions import InvalidCursorError
+
+CURSOR_SEPARATOR = "|"
+
+
+def encode_cursor(created_at: datetime, obj_id: UUID) -> str:
+    raw_cursor = f"{created_at.isoformat()}{CURSOR_SEPARATOR}{obj_id}"
+    return urlsafe_b64encode(raw_cursor.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """raise: InvalidCursorError."""
+    try:
+        raw_created_at, raw_obj_id = urlsafe_b64decode(cursor.encode()).decode().split(CURSOR_SEPARATOR)
+        return datetime.fromisoformat(raw_created_at), UUID(raw_obj_id)
+    except ValueError as error:
+        raise InvalidCursorError(f"Cursor {cursor} is invalid") from error
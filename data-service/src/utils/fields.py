@@ -0,0 +1,29 @@
+from functools import lru_cache
+
+from pydantic import BaseModel, TypeAdapter, create_model
+
+from src.core.exceptions import InvalidFieldsError
+
+FIELDS_SEPARATOR = ","
+
+
+def parse_fields(fields: str, model: type[BaseModel]) -> tuple[str, ...]:
+    """
+    Comma separated field names of model, e.g. id,created_at.
+    raise: InvalidFieldsError.
+    """
+    parsed_fields = tuple(dict.fromkeys(field.strip() for field in fields.split(FIELDS_SEPARATOR) if field.strip()))
+    unknown_fields = [field for field in parsed_fields if field not in model.model_fields]
+    if not parsed_fields or unknown_fields:
+        raise InvalidFieldsError(f"Fields {fields} are invalid, available fields: {', '.join(model.model_fields)}")
+    return parsed_fields
+
+
+@lru_cache
+def get_fields_adapter(model: type[BaseModel], fields: tuple[str, ...]) -> TypeAdapter:
+    """Adapter of a list of model restricted to fields."""
+    fields_model = create_model(
+        f"{model.__name__}Fields",
+        **{field: (model.model_fields[field].annotation, model.model_fields[field]) for field in fields},
+    )
+    return TypeAdapter(list[fields_model])
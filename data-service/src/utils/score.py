@@ -0,0 +1,24 @@
+from math import log
+from typing import Optional
+
+OLD_REVIEWS_COEFFICIENT = 1.77
+NEW_REVIEWS_COEFFICIENT = 25
+
+
+def compute_score(aggregates: dict, coefficient: float = OLD_REVIEWS_COEFFICIENT) -> Optional[float]:
+    """
+    Score formula of the scoring service applied to review aggregates.
+    return: None if there are no reviews older than two years.
+    """
+    old_aggregate = aggregates["old"]
+    if old_aggregate["count"] == 0:
+        return None
+
+    weight = log(coefficient)
+    numerator = (old_aggregate["sum"] / old_aggregate["count"]) * weight
+    denominator = weight
+    for new_aggregate in aggregates["new"]:
+        months_weight = log(NEW_REVIEWS_COEFFICIENT - new_aggregate["months"])
+        numerator += months_weight * new_aggregate["sum"]
+        denominator += months_weight * new_aggregate["count"]
+    return round(numerator / denominator, 2)
@@ -0,0 +1,41 @@
+"""
+Compares cache serializers on the payloads stored by cache_handler.
+Run from scoring-service: python -m benchmarks.cache_serializers [--number 100000]
+"""
+
+import argparse
+from time import time
+from timeit import timeit
+
+from src.core.exceptions import ScoreNotFoundError
+from src.schemas.scoring import ScoreAspects
+from src.services.cache import CACHE_SERIALIZERS, CacheEntry
+
+PAYLOADS = {
+    "general_score": CacheEntry({"general_score": 8.32}, time() + 300),
+    "score_aspect": CacheEntry({"food": 7.9}, time() + 300),
+    "all_scores": CacheEntry(
+        {"general_score": 8.32, **{score_aspect.value: 7.91 for score_aspect in ScoreAspects}},
+        time() + 300,
+    ),
+    "negative": CacheEntry(ScoreNotFoundError("Score was not found"), time() + 300),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000, help="calls per measurement")
+    args = parser.parse_args()
+
+    print(f"{'payload':<14}{'serializer':<12}{'bytes':>8}{'dumps, us':>12}{'loads, us':>12}")
+    for payload_name, entry in PAYLOADS.items():
+        for serializer_name, serializer_class in CACHE_SERIALIZERS.items():
+            serializer = serializer_class()
+            data = serializer.dumps(entry)
+            dumps_time = timeit(lambda: serializer.dumps(entry), number=args.number) / args.number * 10**6
+            loads_time = timeit(lambda: serializer.loads(data), number=args.number) / args.number * 10**6
+            print(f"{payload_name:<14}{serializer_name:<12}{len(data) + 1:>8}{dumps_time:>12.2f}{loads_time:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
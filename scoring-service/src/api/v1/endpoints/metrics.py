@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.core.metrics import REGISTRY
+
+router = APIRouter()
+
+
+class PrometheusResponse(PlainTextResponse):
+    media_type = "text/plain; version=0.0.4"
+
+
+@router.get(
+    "/metrics",
+    response_class=PrometheusResponse,
+    summary="cache and data-service metrics of the process in Prometheus text format",
+)
+async def get_metrics() -> str:
+    return REGISTRY.render()
@@ -3,14 +3,67 @@ from uuid import UUID
 from fastapi import APIRouter, HTTPException, status
 
 from src.core.client import StatusCodeNotOKError
-from src.schemas.scoring import ScoreFilterDependancy
-from src.services.scoring import LogarithmError, ScoreNotFoundError, ScoreServiceDependancy
+from src.core.exceptions import LogarithmError, ScoreNotFoundError
+from src.schemas.scoring import ScoreBatchIn, ScoreBatchOut, ScoreFilterDependancy
+from src.services.scoring import ScoreServiceDependancy
 
 from . import ERROR_RESPONSE
 
 router = APIRouter()
 
 
+@router.post(
+    "/scores:batch",
+    response_model=ScoreBatchOut,
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: ERROR_RESPONSE},
+    summary="if score_aspects are not provided, general_score will be computed, errors are returned per accommodation",
+)
+async def get_batch_scores(
+    score_batch: ScoreBatchIn,
+    score_service: ScoreServiceDependancy,
+) -> ScoreBatchOut:
+    score_aspects = None
+    if score_batch.score_aspects is not None:
+        score_aspects = [score_aspect.value for score_aspect in score_batch.score_aspects]
+    try:
+        scores, errors = await score_service.get_batch_scores(score_batch.accommodation_ids, score_aspects)
+    except Exception as error:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, f"Unexpected error: {error}")
+    return ScoreBatchOut(scores=scores, errors=errors)
+
+
+@router.get(
+    "/{accommodation_id}/all",
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                "application/json": {
+                    "example": {"general_score": 8.32, "food": 7.9, "location": 8.5},
+                },
+            },
+        },
+        status.HTTP_404_NOT_FOUND: ERROR_RESPONSE,
+        status.HTTP_500_INTERNAL_SERVER_ERROR: ERROR_RESPONSE,
+        status.HTTP_503_SERVICE_UNAVAILABLE: ERROR_RESPONSE,
+    },
+    summary="general_score and every score_aspect that has reviews older than 2 years",
+)
+async def get_all_scores(
+    accommodation_id: UUID,
+    score_service: ScoreServiceDependancy,
+) -> dict:
+    try:
+        return await score_service.get_all_scores(accommodation_id)
+    except ScoreNotFoundError as error:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, str(error))
+    except LogarithmError as error:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, str(error))
+    except (StatusCodeNotOKError, ConnectionError) as error:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, str(error))
+    except Exception as error:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, f"Unexpected error: {error}")
+
+
 @router.get(
     "/{accommodation_id}",
     responses={
@@ -45,3 +98,19 @@ async def get_score(
         raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, str(error))
     except Exception as error:
         raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, f"Unexpected error: {error}")
+
+
+@router.delete(
+    "/{accommodation_id}/cache",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: ERROR_RESPONSE},
+    summary="drops cached scores of the accommodation, should be called when its reviews change",
+)
+async def invalidate_scores(
+    accommodation_id: UUID,
+    score_service: ScoreServiceDependancy,
+) -> None:
+    try:
+        await score_service.invalidate(accommodation_id)
+    except Exception as error:
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, f"Unexpected error: {error}")
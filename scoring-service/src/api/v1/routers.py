@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 
+from .endpoints.metrics import router as metrics_router
 from .endpoints.scoring import router as scoring_router
 
 router = APIRouter()
@@ -8,3 +9,7 @@ router.include_router(
     prefix="/scoring",
     tags=["scoring"],
 )
+router.include_router(
+    metrics_router,
+    tags=["metrics"],
+)
@@ -1,45 +1,462 @@
+import asyncio
+import logging
 from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
 from functools import lru_cache
-from typing import Optional
+from random import sample, uniform
+from time import monotonic
+from typing import AsyncIterator, Iterator, Optional
 
 from fastapi import status
-from httpx import AsyncClient, HTTPError
+from httpx import AsyncClient, HTTPError, Limits, Response, Timeout
+
+from .config import settings
+from .metrics import (
+    DATA_SERVICE_EJECTIONS,
+    DATA_SERVICE_ERRORS,
+    DATA_SERVICE_HEDGES,
+    DATA_SERVICE_REQUEST_SECONDS,
+    DATA_SERVICE_RETRIES,
+)
 
 
 class StatusCodeNotOKError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(ConnectionError):
     pass
 
 
+class CircuitBreaker:
+    """
+    Opens after failure_threshold failures in a row, requests fail fast while it is open.
+    After recovery_timeout one trial request is let through, its result closes the breaker or opens it again.
+    failure_threshold=0 disables the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow_request(self) -> bool:
+        if self.opened_at is None:
+            return True
+        now = monotonic()
+        if now - self.opened_at < self.recovery_timeout:
+            return False
+        # a trial that never reported back, e.g. a cancelled one, does not block the breaker forever
+        if self.trial_started_at is not None and now - self.trial_started_at < self.recovery_timeout:
+            return False
+        self.trial_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial_started_at = None
+        if self.failure_threshold and self.failures >= self.failure_threshold:
+            self.opened_at = monotonic()
+
+
+class Endpoint:
+    """Replica of data-service, latency is an exponentially weighted moving average in seconds."""
+
+    LATENCY_DECAY = 0.3
+
+    def __init__(self, url: str) -> None:
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.latency = 0.0
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def __repr__(self):
+        return f"Endpoint(url={self.url} outstanding={self.outstanding} latency={self.latency:.3f})"
+
+
+class BalancedRequest:
+    """
+    Outcome is set by the caller with finish once it is known, requests with unknown outcome are not recorded.
+    Latency is measured until the first outcome, e.g. response headers of a stream.
+    """
+
+    def __init__(self, url: str, endpoint: Optional[Endpoint] = None) -> None:
+        self.url = url
+        self.endpoint = endpoint
+        self.failed: Optional[bool] = None
+        self.started_at = monotonic()
+        self.finished_at: Optional[float] = None
+
+    def finish(self, failed: bool) -> None:
+        self.failed = failed
+        if self.finished_at is None:
+            self.finished_at = monotonic()
+
+    def get_latency(self) -> float:
+        return (monotonic() if self.finished_at is None else self.finished_at) - self.started_at
+
+
+class LoadBalancer:
+    """
+    Sends requests to base_url to one of the replica urls chosen by power of two choices,
+    the one with less outstanding requests and then lower latency wins.
+    Replicas failed ejection_threshold times in a row are out of rotation for ejection_time seconds,
+    every replica is used if all of them are ejected.
+    """
+
+    def __init__(self, base_url: str, urls: list[str], ejection_threshold: int, ejection_time: float) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.ejection_threshold = ejection_threshold
+        self.ejection_time = ejection_time
+
+    def pick(self, exclude: Optional[Endpoint] = None) -> Endpoint:
+        """exclude, e.g. the replica a retried request failed on, is picked only if there is no other one."""
+        now = monotonic()
+        healthy_endpoints = [endpoint for endpoint in self.endpoints if not endpoint.is_ejected(now)]
+        endpoints = [endpoint for endpoint in healthy_endpoints if endpoint is not exclude] or healthy_endpoints
+        endpoints = endpoints or self.endpoints
+        if len(endpoints) == 1:
+            return endpoints[0]
+        return min(sample(endpoints, 2), key=lambda endpoint: (endpoint.outstanding, endpoint.latency))
+
+    def record(self, endpoint: Endpoint, latency: float, failed: bool) -> None:
+        """Latency of failed requests is not recorded, a replica failing fast would look the fastest."""
+        if not failed:
+            endpoint.latency += endpoint.LATENCY_DECAY * (latency - endpoint.latency)
+            DATA_SERVICE_REQUEST_SECONDS.observe(latency, endpoint=endpoint.url)
+            endpoint.failures = 0
+            return
+
+        endpoint.failures += 1
+        if self.ejection_threshold and endpoint.failures >= self.ejection_threshold:
+            endpoint.failures = 0
+            endpoint.ejected_until = monotonic() + self.ejection_time
+            DATA_SERVICE_EJECTIONS.inc(endpoint=endpoint.url)
+            logging.warning("%s is out of rotation for %ss", endpoint.url, self.ejection_time)
+
+    @contextmanager
+    def request(self, url: str, exclude: Optional[Endpoint] = None) -> Iterator[BalancedRequest]:
+        """Urls not starting with base_url are requested as is."""
+        if url != self.base_url and not url.startswith(f"{self.base_url}/"):
+            yield BalancedRequest(url)
+            return
+
+        endpoint = self.pick(exclude)
+        balanced_request = BalancedRequest(endpoint.url + url.removeprefix(self.base_url), endpoint)
+        endpoint.outstanding += 1
+        try:
+            yield balanced_request
+        finally:
+            endpoint.outstanding -= 1
+            if balanced_request.failed is not None:
+                self.record(endpoint, balanced_request.get_latency(), balanced_request.failed)
+
+
+class HedgingPolicy:
+    """
+    A GET not completed within percentile of the last window latencies is sent once more.
+    Every request earns budget hedges up to max_tokens, so hedges add at most budget share of requests.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        budget: float,
+        window: int = 200,
+        min_samples: int = 20,
+        max_tokens: float = 10,
+    ) -> None:
+        self.percentile = percentile
+        self.budget = budget
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.max_tokens = max_tokens
+        self.tokens = 0.0
+
+    def record(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    def get_delay(self) -> Optional[float]:
+        """return: None until min_samples latencies are recorded."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * self.percentile / 100), len(latencies) - 1)]
+
+    def earn(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.budget)
+
+    def acquire(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
 class AbstractClient(ABC):
     API_REQUEST = "ENDPOINT: {url}. HEADERS: {headers}. PARAMS: {params}. "
     API_NOT_AVALIABLE = API_REQUEST + "API not avaliable " + "ERROR: {error}."
     STATUS_CODE_ERROR = API_REQUEST + "Unexpected return code: {status_code}."
+    CIRCUIT_OPEN = API_REQUEST + "API not avaliable, requests are paused after repeated failures."
 
     @abstractmethod
     async def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> dict:
         pass
 
+    @abstractmethod
+    async def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> Response:
+        pass
+
+    @abstractmethod
+    def iter_lines(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> AsyncIterator[str]:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
 
 class CustomAsyncClient(AbstractClient):
-    def __init__(self, client: AsyncClient):
+    """
+    GET requests failed with connection errors or RETRY_STATUS_CODES are retried DATA_SERVICE_RETRIES times
+    with jittered exponential backoff, streams are retried only if no line was received.
+    Slow GET requests are hedged with hedging_policy, streams are not.
+    """
+
+    RETRY_STATUS_CODES = frozenset(
+        (status.HTTP_502_BAD_GATEWAY, status.HTTP_503_SERVICE_UNAVAILABLE, status.HTTP_504_GATEWAY_TIMEOUT),
+    )
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        load_balancer: Optional[LoadBalancer] = None,
+        hedging_policy: Optional[HedgingPolicy] = None,
+    ):
         self.client = client
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(0, 0)
+        self.load_balancer = load_balancer or LoadBalancer("", [], 0, 0)
+        self.hedging_policy = hedging_policy
 
     async def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> dict:
-        request_params = dict(url=url, params=params, headers=headers)
-        try:
-            response = await self.client.get(url=url, params=params)
-        except HTTPError as error:
-            message = self.API_NOT_AVALIABLE.format(**request_params, error=error)
-            raise ConnectionError(message)
+        response = await self.get_response(url, params, headers)
+        return response.json()
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        if attempt >= settings.DATA_SERVICE_RETRIES or isinstance(error, CircuitOpenError):
+            return False
+        return isinstance(error, ConnectionError) or error.status_code in self.RETRY_STATUS_CODES
+
+    @staticmethod
+    def get_retry_delay(attempt: int) -> float:
+        """Full jitter, concurrent retries of many requests do not hit data-service at once."""
+        backoff = settings.DATA_SERVICE_RETRY_BACKOFF * 2**attempt
+        return uniform(0, min(settings.DATA_SERVICE_RETRY_MAX_BACKOFF, backoff))
 
+    def check_circuit(self, request_params: dict) -> None:
+        """raise: CircuitOpenError."""
+        if not self.circuit_breaker.allow_request():
+            DATA_SERVICE_ERRORS.inc(reason="circuit_open")
+            raise CircuitOpenError(self.CIRCUIT_OPEN.format(**request_params))
+
+    def check_status_code(self, response: Response, request_params: dict, balanced_request: BalancedRequest) -> None:
+        """Server errors count as failures of data-service, other codes as successful requests."""
         response_status_code = response.status_code
+        balanced_request.finish(response_status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if balanced_request.failed:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
         if response_status_code != status.HTTP_200_OK:
+            DATA_SERVICE_ERRORS.inc(reason=f"status_{response_status_code}")
             message = self.STATUS_CODE_ERROR.format(**request_params, status_code=response_status_code)
-            raise StatusCodeNotOKError(message)
+            raise StatusCodeNotOKError(message, response_status_code)
 
-        return response.json()
+    def get_connection_error(
+        self,
+        error: HTTPError,
+        request_params: dict,
+        balanced_request: BalancedRequest,
+    ) -> ConnectionError:
+        balanced_request.finish(True)
+        DATA_SERVICE_ERRORS.inc(reason="connection")
+        self.circuit_breaker.record_failure()
+        return ConnectionError(self.API_NOT_AVALIABLE.format(**request_params, error=error))
+
+    async def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> Response:
+        attempt, tried_endpoints = 0, []
+        while True:
+            try:
+                if self.hedging_policy is None:
+                    return await self._get_response(url, params, headers, tried_endpoints)
+                return await self._get_hedged_response(url, params, headers, tried_endpoints)
+            except (ConnectionError, StatusCodeNotOKError) as error:
+                if not self.should_retry(error, attempt):
+                    raise
+            DATA_SERVICE_RETRIES.inc()
+            await asyncio.sleep(self.get_retry_delay(attempt))
+            attempt += 1
+
+    async def _get_hedged_response(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        tried_endpoints: Optional[list[Endpoint]] = None,
+    ) -> Response:
+        """
+        The request is sent again, to another replica if there is one, when it is slower than the hedging delay.
+        The first successful response wins and the other request is cancelled.
+        """
+        self.hedging_policy.earn()
+        delay = self.hedging_policy.get_delay()
+        primary = asyncio.ensure_future(self._get_response(url, params, headers, tried_endpoints))
+        if delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, tasks = await asyncio.wait(tasks, timeout=delay)
+            if done or not self.hedging_policy.acquire():
+                return await primary
+
+            DATA_SERVICE_HEDGES.inc(result="sent")
+            tasks.add(asyncio.ensure_future(self._get_response(url, params, headers, tried_endpoints)))
+            while True:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                successful_tasks = [task for task in done if task.exception() is None]
+                if successful_tasks:
+                    if successful_tasks[0] is not primary:
+                        DATA_SERVICE_HEDGES.inc(result="won")
+                    return successful_tasks[0].result()
+                if not tasks:
+                    return done.pop().result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _get_response(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        tried_endpoints: Optional[list[Endpoint]] = None,
+    ) -> Response:
+        """The endpoint of data-service is appended to tried_endpoints, retries avoid the last one."""
+        request_params = dict(url=url, params=params, headers=headers)
+        self.check_circuit(request_params)
+        tried_endpoints = [] if tried_endpoints is None else tried_endpoints
+        with self.load_balancer.request(url, tried_endpoints[-1] if tried_endpoints else None) as balanced_request:
+            tried_endpoints.append(balanced_request.endpoint)
+            started_at = monotonic()
+            try:
+                response = await self.client.get(url=balanced_request.url, params=params)
+            except HTTPError as error:
+                raise self.get_connection_error(error, request_params, balanced_request)
+
+            self.check_status_code(response, request_params, balanced_request)
+            if self.hedging_policy is not None:
+                self.hedging_policy.record(monotonic() - started_at)
+            return response
+
+    async def iter_lines(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+    ) -> AsyncIterator[str]:
+        """Non empty lines of the response body as they are received."""
+        attempt, tried_endpoints = 0, []
+        while True:
+            lines_received = False
+            try:
+                async for line in self._iter_lines(url, params, headers, tried_endpoints):
+                    lines_received = True
+                    yield line
+                return
+            except (ConnectionError, StatusCodeNotOKError) as error:
+                if lines_received or not self.should_retry(error, attempt):
+                    raise
+            DATA_SERVICE_RETRIES.inc()
+            await asyncio.sleep(self.get_retry_delay(attempt))
+            attempt += 1
+
+    async def _iter_lines(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        tried_endpoints: Optional[list[Endpoint]] = None,
+    ) -> AsyncIterator[str]:
+        request_params = dict(url=url, params=params, headers=headers)
+        self.check_circuit(request_params)
+        tried_endpoints = [] if tried_endpoints is None else tried_endpoints
+        with self.load_balancer.request(url, tried_endpoints[-1] if tried_endpoints else None) as balanced_request:
+            tried_endpoints.append(balanced_request.endpoint)
+            try:
+                async with self.client.stream("GET", url=balanced_request.url, params=params) as response:
+                    self.check_status_code(response, request_params, balanced_request)
+                    async for line in response.aiter_lines():
+                        if line:
+                            yield line
+            except HTTPError as error:
+                raise self.get_connection_error(error, request_params, balanced_request)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_client() -> CustomAsyncClient:
+    """Client of data-service tuned by DATA_SERVICE_* settings."""
+    client = AsyncClient(
+        limits=Limits(
+            max_connections=settings.DATA_SERVICE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.DATA_SERVICE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.DATA_SERVICE_KEEPALIVE_EXPIRY,
+        ),
+        timeout=Timeout(
+            settings.DATA_SERVICE_READ_TIMEOUT,
+            connect=settings.DATA_SERVICE_CONNECT_TIMEOUT,
+            pool=settings.DATA_SERVICE_POOL_TIMEOUT,
+        ),
+    )
+    circuit_breaker = CircuitBreaker(
+        settings.DATA_SERVICE_CIRCUIT_BREAKER_THRESHOLD,
+        settings.DATA_SERVICE_CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+    )
+    load_balancer = LoadBalancer(
+        settings.DATA_SERVICE_ULR,
+        settings.DATA_SERVICE_URLS or [settings.DATA_SERVICE_ULR],
+        settings.DATA_SERVICE_EJECTION_THRESHOLD,
+        settings.DATA_SERVICE_EJECTION_TIME,
+    )
+    hedging_policy = None
+    if settings.DATA_SERVICE_HEDGING_ENABLED:
+        hedging_policy = HedgingPolicy(settings.DATA_SERVICE_HEDGING_PERCENTILE, settings.DATA_SERVICE_HEDGING_BUDGET)
+    return CustomAsyncClient(client, circuit_breaker, load_balancer, hedging_policy)
 
 
 @lru_cache
 def get_custom_client() -> CustomAsyncClient:
-    return CustomAsyncClient(AsyncClient())
+    return create_client()
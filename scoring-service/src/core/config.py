@@ -1,5 +1,7 @@
 from pathlib import Path
+from typing import Literal, Optional
 
+from pydantic import PositiveInt
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,10 +12,71 @@ class Settings(BaseSettings):
 
     REDIS_HOST: str
     REDIS_PORT: str
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 1.0
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 1.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
     CACHE_LIFETIME: int = 60 * 5
     CACHE_ENABLED: bool
+    CACHE_STALE_LIFETIME: int = 60 * 60
+    NEGATIVE_CACHE_LIFETIME: int = 60 * 5
+    SCORE_CACHE_MAX_LIFETIME: int = 60 * 60 * 24 * 3
+    SCORE_CACHE_UNDATED_LIFETIME: int = 60 * 60 * 3
+    CACHE_REFRESH_AHEAD_ENABLED: bool = False
+    CACHE_REFRESH_AHEAD_WINDOW: int = 60 * 5
+    CACHE_NAMESPACE: str = "scoring"
+    CACHE_SERIALIZER: Literal["json", "pickle"] = "json"
+    SCORE_FORMULA_VERSION: int = 1
+    LOCAL_CACHE_ENABLED: bool = True
+    LOCAL_CACHE_MAX_SIZE: int = 10000
+    LOCAL_CACHE_TTL: int = 60
+    SINGLE_FLIGHT_LOCK_ENABLED: bool = True
+    SINGLE_FLIGHT_LOCK_TIMEOUT: float = 10.0
+    SINGLE_FLIGHT_WAIT_TIMEOUT: float = 5.0
+    SINGLE_FLIGHT_POLL_INTERVAL: float = 0.05
 
     DATA_SERVICE_ULR: str = "http://localhost:8000"
+    DATA_SERVICE_URLS: list[str] = []
+    DATA_SERVICE_EJECTION_THRESHOLD: int = 3
+    DATA_SERVICE_EJECTION_TIME: float = 30.0
+    DATA_SERVICE_MAX_CONNECTIONS: int = 100
+    DATA_SERVICE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    DATA_SERVICE_KEEPALIVE_EXPIRY: float = 30.0
+    DATA_SERVICE_CONNECT_TIMEOUT: float = 1.0
+    DATA_SERVICE_READ_TIMEOUT: float = 10.0
+    DATA_SERVICE_POOL_TIMEOUT: float = 2.0
+    DATA_SERVICE_RETRIES: int = 2
+    DATA_SERVICE_RETRY_BACKOFF: float = 0.1
+    DATA_SERVICE_RETRY_MAX_BACKOFF: float = 1.0
+    DATA_SERVICE_CIRCUIT_BREAKER_THRESHOLD: int = 5
+    DATA_SERVICE_CIRCUIT_BREAKER_RECOVERY_TIMEOUT: float = 10.0
+    DATA_SERVICE_HEDGING_ENABLED: bool = False
+    DATA_SERVICE_HEDGING_PERCENTILE: float = 95.0
+    DATA_SERVICE_HEDGING_BUDGET: float = 0.05
+    SCORE_SOURCE: Literal["reviews", "aggregates", "buckets", "stream", "materialized"] = "reviews"
+    SCORE_ENGINE: Literal["python", "numpy"] = "python"
+    REVIEWS_PAGINATION: Literal["cursor", "offset"] = "cursor"
+    REVIEWS_PAGE_SIZE: PositiveInt = 1000
+    REVIEWS_FETCH_CONCURRENCY: PositiveInt = 4
+    REVIEWS_STREAM_BATCH_SIZE: PositiveInt = 100
+    REVIEWS_FULL_VALIDATION: bool = False
+
+    REVIEW_EVENTS_DSN: Optional[str] = None
+    REVIEW_EVENTS_CHANNEL: str = "review_changed"
+    REVIEW_EVENTS_RECOMPUTE: bool = False
+    REVIEW_EVENTS_RECONNECT_INTERVAL: float = 5.0
+
+    CACHE_WARMUP_ON_STARTUP: bool = False
+    CACHE_WARMUP_HOT_LIST: Optional[str] = None
+    CACHE_WARMUP_CONCURRENCY: int = 4
+    CACHE_WARMUP_RATE_LIMIT: float = 20.0
+    CACHE_WARMUP_PAGE_SIZE: int = 1000
+    CACHE_WARMUP_PROGRESS_INTERVAL: int = 100
+    CACHE_WARMUP_LOCK_TIMEOUT: int = 60 * 60
+
+    SCORE_BATCH_MAX_SIZE: int = 200
+    SCORE_BATCH_CONCURRENCY: int = 8
 
 
 settings = Settings()
@@ -0,0 +1,6 @@
+class LogarithmError(Exception):
+    pass
+
+
+class ScoreNotFoundError(Exception):
+    pass
@@ -0,0 +1,184 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from math import inf
+from time import perf_counter
+from typing import Iterator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, inf)
+
+
+def format_value(value: float) -> str:
+    if value == inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Metric(ABC):
+    """Values of a metric by label values, labels are passed as keyword arguments."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple[str, ...], object] = {}
+
+    def get_label_values(self, labels: dict[str, str]) -> tuple[str, ...]:
+        """raise: ValueError if labels are not labelnames."""
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(f"{self.name} has labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[labelname]) for labelname in self.labelnames)
+
+    @abstractmethod
+    def render_samples(self) -> Iterator[str]:
+        pass
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.render_samples()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        label_values = self.get_label_values(labels)
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(self.get_label_values(labels), 0)
+
+    def render_samples(self) -> Iterator[str]:
+        for label_values, value in self.values.items():
+            yield f"{self.name}{format_labels(dict(zip(self.labelnames, label_values)))} {format_value(value)}"
+
+
+class Histogram(Metric):
+    """Observations are counted in the first bucket they fit, buckets are rendered cumulative."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets if buckets[-1] == inf else (*buckets, inf)
+
+    def observe(self, value: float, **labels: str) -> None:
+        label_values = self.get_label_values(labels)
+        if label_values not in self.values:
+            self.values[label_values] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        observations = self.values[label_values]
+        observations["buckets"][bisect_left(self.buckets, value)] += 1
+        observations["sum"] += value
+        observations["count"] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes the duration of the block in seconds, also when it raises."""
+        started_at = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started_at, **labels)
+
+    def get_count(self, **labels: str) -> int:
+        observations = self.values.get(self.get_label_values(labels))
+        return 0 if observations is None else observations["count"]
+
+    def render_samples(self) -> Iterator[str]:
+        for label_values, observations in self.values.items():
+            labels = dict(zip(self.labelnames, label_values))
+            cumulative_count = 0
+            for bucket, count in zip(self.buckets, observations["buckets"]):
+                cumulative_count += count
+                bucket_labels = format_labels({**labels, "le": format_value(bucket)})
+                yield f"{self.name}_bucket{bucket_labels} {cumulative_count}"
+            yield f"{self.name}_sum{format_labels(labels)} {format_value(observations['sum'])}"
+            yield f"{self.name}_count{format_labels(labels)} {observations['count']}"
+
+
+class MetricsRegistry:
+    """Metrics of the process, every worker process has its own."""
+
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """raise: ValueError if a metric with the same name is registered."""
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """return: metrics in Prometheus text exposition format."""
+        return "".join(f"{line}\n" for metric in self.metrics.values() for line in metric.render())
+
+
+REGISTRY = MetricsRegistry()
+
+CACHE_HITS = REGISTRY.counter("scoring_cache_hits_total", "Fresh cached scores returned.", ("cache",))
+CACHE_MISSES = REGISTRY.counter("scoring_cache_misses_total", "Scores not found in cache.", ("cache",))
+CACHE_STALE = REGISTRY.counter(
+    "scoring_cache_stale_total",
+    "Stale cached scores returned while they are recomputed.",
+    ("cache",),
+)
+CACHE_COMPUTE_SECONDS = REGISTRY.histogram(
+    "scoring_cache_compute_seconds",
+    "Duration of computing a score that is cached.",
+    ("cache",),
+)
+DATA_SERVICE_PAGES = REGISTRY.counter("scoring_data_service_pages_total", "Review pages fetched.", ("source",))
+DATA_SERVICE_REVIEWS = REGISTRY.counter("scoring_data_service_reviews_total", "Reviews processed.", ("source",))
+DATA_SERVICE_REQUEST_SECONDS = REGISTRY.histogram(
+    "scoring_data_service_request_seconds",
+    "Duration of data-service requests by replica.",
+    ("endpoint",),
+)
+DATA_SERVICE_EJECTIONS = REGISTRY.counter(
+    "scoring_data_service_ejections_total",
+    "Replicas taken out of rotation after failures.",
+    ("endpoint",),
+)
+DATA_SERVICE_HEDGES = REGISTRY.counter(
+    "scoring_data_service_hedges_total",
+    "Hedged data-service requests sent and hedges that answered first.",
+    ("result",),
+)
+DATA_SERVICE_RETRIES = REGISTRY.counter("scoring_data_service_retries_total", "Retried data-service requests.")
+DATA_SERVICE_ERRORS = REGISTRY.counter(
+    "scoring_data_service_errors_total",
+    "Failed data-service requests.",
+    ("reason",),
+)
@@ -1,11 +1,53 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 import uvicorn
 from fastapi import FastAPI
 
 from src.api.v1.routers import router as main_router_v1
+from src.core.client import get_custom_client
+from src.core.config import settings
+from src.services.cache import create_cache
+from src.services.events import get_review_events_listener
+from src.services.scoring import get_score_service
+from src.services.warmup import run_startup_warmup
+
+
+async def stop_background_task(task: asyncio.Task) -> None:
+    """Errors of the task are logged, they don't stop the shutdown."""
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception:
+        logging.exception("Background task failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    app.state.cache = create_cache()
+    background_tasks = []
+    score_service = get_score_service(app.state.cache)
+    review_events_listener = get_review_events_listener(score_service)
+    if review_events_listener is not None:
+        background_tasks.append(asyncio.create_task(review_events_listener.run()))
+    if settings.CACHE_WARMUP_ON_STARTUP and settings.CACHE_ENABLED:
+        background_tasks.append(asyncio.create_task(run_startup_warmup(score_service)))
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            await stop_background_task(task)
+        await app.state.cache.close()
+        await get_custom_client().close()
+        get_custom_client.cache_clear()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
     app.include_router(main_router_v1)
     return app
 
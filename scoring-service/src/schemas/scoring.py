@@ -4,7 +4,9 @@ from typing import Annotated, Optional
 from uuid import UUID
 
 from fastapi import Depends
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
+
+from src.core.config import settings
 
 
 class ScoreAspects(str, Enum):
@@ -52,3 +54,16 @@ class BaseScore(BaseModel):
 
 class ScoreIn(BaseScore):
     pass
+
+
+ScoresInAdapter = TypeAdapter(list[ScoreIn])
+
+
+class ScoreBatchIn(BaseModel):
+    accommodation_ids: list[UUID] = Field(..., min_length=1, max_length=settings.SCORE_BATCH_MAX_SIZE)
+    score_aspects: Optional[list[ScoreAspects]] = None
+
+
+class ScoreBatchOut(BaseModel):
+    scores: dict[UUID, dict[str, float]]
+    errors: dict[UUID, str]
@@ -1,13 +1,25 @@
+import asyncio
+import inspect
+import json
+import logging
 import pickle
 from abc import ABC, abstractmethod
-from functools import wraps
-from typing import Annotated, Any, Callable, Optional, Union
+from collections import OrderedDict
+from contextvars import ContextVar
+from enum import Enum
+from functools import lru_cache, partial, wraps
+from math import ceil, inf
+from time import monotonic, time
+from typing import Annotated, Any, Awaitable, Callable, NamedTuple, Optional, Union
+from uuid import uuid4
 
-from fastapi import Depends
-from redis.asyncio import ConnectionPool as AsyncConnectionPool
+from fastapi import Depends, Request
+from redis.asyncio import BlockingConnectionPool
 from redis.asyncio.client import Redis as AsyncRedis
 
 from src.core.config import settings
+from src.core.exceptions import LogarithmError, ScoreNotFoundError
+from src.core.metrics import CACHE_COMPUTE_SECONDS, CACHE_HITS, CACHE_MISSES, CACHE_STALE
 
 
 class AbstractCache(ABC):
@@ -19,7 +31,37 @@ class AbstractCache(ABC):
         pass
 
     @abstractmethod
-    async def set(self, key: str, value: Union[bytes, str], expire: int):
+    async def get_many(self, keys: list[str]) -> list:
+        pass
+
+    @abstractmethod
+    async def set(
+        self,
+        key: str,
+        value: Union[bytes, str],
+        expire: Optional[int],
+        generation: Optional[tuple[str, str]] = None,
+    ) -> bool:
+        pass
+
+    @abstractmethod
+    async def get_generation(self, key: str) -> str:
+        pass
+
+    @abstractmethod
+    async def increment(self, key: str, expire: int) -> int:
+        pass
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        pass
+
+    @abstractmethod
+    async def acquire_lock(self, key: str, expire: float) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def release_lock(self, key: str, token: str):
         pass
 
     @abstractmethod
@@ -28,52 +70,589 @@ class AbstractCache(ABC):
 
 
 class CacheRedis(AbstractCache):
+    RELEASE_LOCK_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
+    SET_IF_GENERATION_SCRIPT = """
+    if (redis.call("get", KEYS[2]) or "0") ~= ARGV[3] then
+        return 0
+    end
+    if ARGV[2] == "" then
+        redis.call("set", KEYS[1], ARGV[1])
+    else
+        redis.call("set", KEYS[1], ARGV[1], "EX", ARGV[2])
+    end
+    return 1
+    """
+
     async def get(self, key: str) -> Optional[dict]:
         return await self.cache.get(key)
 
-    async def set(self, key: str, value: Union[bytes, str], expire: int):
-        await self.cache.set(name=key, value=value, ex=expire)
+    async def get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        if not keys:
+            return []
+        return await self.cache.mget(keys)
+
+    async def set(
+        self,
+        key: str,
+        value: Union[bytes, str],
+        expire: Optional[int],
+        generation: Optional[tuple[str, str]] = None,
+    ) -> bool:
+        """
+        generation is (key, generation) read with get_generation, value is set only if it was not incremented since.
+        return: whether value was set.
+        """
+        if generation is None:
+            await self.cache.set(name=key, value=value, ex=expire)
+            return True
+        generation_key, generation_value = generation
+        script_args = (key, generation_key, value, "" if expire is None else expire, generation_value)
+        return bool(await self.cache.eval(self.SET_IF_GENERATION_SCRIPT, 2, *script_args))
+
+    async def get_generation(self, key: str) -> str:
+        """return: "0" if the generation was never incremented."""
+        generation = await self.cache.get(key)
+        return "0" if generation is None else generation.decode()
+
+    async def increment(self, key: str, expire: int) -> int:
+        async with self.cache.pipeline(transaction=True) as pipeline:
+            pipeline.incr(key)
+            pipeline.expire(key, expire)
+            generation, _ = await pipeline.execute()
+        return generation
+
+    async def delete(self, *keys: str):
+        await self.cache.delete(*keys)
+
+    async def acquire_lock(self, key: str, expire: float) -> Optional[str]:
+        """return: token to release the lock with or None if the lock is held by someone else."""
+        token = uuid4().hex
+        if await self.cache.set(name=key, value=token, nx=True, px=int(expire * 1000)):
+            return token
+        return None
+
+    async def release_lock(self, key: str, token: str):
+        """Lock is deleted only if it was not expired and taken by someone else."""
+        await self.cache.eval(self.RELEASE_LOCK_SCRIPT, 1, key, token)
 
     async def close(self):
-        await self.cache.close()
+        await self.cache.aclose()
+        await self.cache.connection_pool.disconnect()
+
+
+def create_cache() -> CacheRedis:
+    """Cache with its own connection pool, created once per application in lifespan."""
+    pool = BlockingConnectionPool.from_url(
+        f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+    )
+    return CacheRedis(AsyncRedis(connection_pool=pool))
+
+
+def get_cache(request: Request) -> CacheRedis:
+    return request.app.state.cache
+
+
+CacheDependancy = Annotated[CacheRedis, Depends(get_cache)]
+
+MISSING = object()
+
+
+class CacheEntry(NamedTuple):
+    """
+    Value is fresh until stale_at (unix time) and is served stale until the entry expires.
+    Value is an exception for negative entries, they are not served stale.
+    """
+
+    value: Any
+    stale_at: float
+
+    @classmethod
+    def build(cls, value: Any, expire: Optional[int]) -> "CacheEntry":
+        return cls(value, inf if expire is None else time() + expire)
+
+    @property
+    def is_error(self) -> bool:
+        return isinstance(self.value, Exception)
+
+    def get_value(self) -> Any:
+        """raise: the cached exception of a negative entry."""
+        if self.is_error:
+            raise type(self.value)(*self.value.args)
+        return self.value
+
+    def is_stale(self) -> bool:
+        return time() >= self.stale_at
+
+    def get_ttl(self) -> Optional[int]:
+        """return: seconds until the entry expires, None if it never does."""
+        if self.stale_at == inf:
+            return None
+        ttl = max(ceil(self.stale_at - time()), 0)
+        if self.is_error:
+            return max(ttl, 1)
+        return ttl + settings.CACHE_STALE_LIFETIME
+
+
+class LocalCache:
+    """In-process LRU cache with per entry TTL, values are kept deserialized."""
+
+    def __init__(self, max_size: int, ttl: int) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.items: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        item = self.items.get(key)
+        if item is not None and item[0] <= monotonic():
+            del self.items[key]
+            item = None
+        if item is None:
+            self.misses += 1
+            return default
+        self.items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: str, value: Any, expire: Optional[int] = None) -> None:
+        ttl = self.ttl if expire is None else min(self.ttl, expire)
+        self.items[key] = (monotonic() + ttl, value)
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self.items.pop(key, None)
+
+    def clear(self) -> None:
+        self.items.clear()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+@lru_cache
+def get_local_cache() -> LocalCache:
+    return LocalCache(settings.LOCAL_CACHE_MAX_SIZE, settings.LOCAL_CACHE_TTL)
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one task, it is not cancelled with the callers."""
+
+    def __init__(self) -> None:
+        self.tasks: dict[str, asyncio.Future] = {}
+
+    def start(self, key: str, func: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        task = self.tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self.tasks[key] = task
+            task.add_done_callback(partial(self.forget, key))
+        return task
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        return await asyncio.shield(self.start(key, func))
+
+    def run_in_background(self, key: str, func: Callable[[], Awaitable[Any]]) -> None:
+        self.start(key, func).add_done_callback(partial(self.log_error, key))
+
+    @staticmethod
+    def log_error(key: str, task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning("Background refresh of %s failed: %s", key, task.exception())
+
+    def forget(self, key: str, task: asyncio.Future) -> None:
+        if self.tasks.get(key) is task:
+            del self.tasks[key]
+
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    return SingleFlight()
+
+
+class CacheExpiry:
+    """Earliest moment the value being computed changes by itself, see limit_cache_expiry."""
+
+    def __init__(self) -> None:
+        self.expire_at = inf
+
+    def limit(self, expire: Optional[int]) -> Optional[int]:
+        if self.expire_at == inf:
+            return expire
+        seconds = max(ceil(self.expire_at - time()), 1)
+        return seconds if expire is None else min(expire, seconds)
+
+
+cache_expiry: ContextVar[Optional[CacheExpiry]] = ContextVar("cache_expiry", default=None)
+
+
+def limit_cache_expiry(expire_at: float) -> None:
+    """Value computed for cache_handler in the current context stays fresh until expire_at (unix time) at most."""
+    expiry = cache_expiry.get()
+    if expiry is not None and expire_at < expiry.expire_at:
+        expiry.expire_at = expire_at
 
 
-async def get_cache() -> CacheRedis:
-    pool = AsyncConnectionPool.from_url(f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}")
-    redis = AsyncRedis(connection_pool=pool)
-    cache = CacheRedis(redis)
+def get_cache_key_part(value: Any) -> str:
+    if isinstance(value, Enum):
+        value = value.value
+    return "" if value is None else str(value)
+
+
+def get_cache_key(name: str, *args) -> str:
+    """
+    Same key in every process, e.g. scoring:v1:score_aspect:<accommodation_id>:food.
+    Bumping SCORE_FORMULA_VERSION makes every cached score unreachable.
+    """
+    version = f"v{settings.SCORE_FORMULA_VERSION}"
+    parts = [settings.CACHE_NAMESPACE, version, name, *map(get_cache_key_part, args)]
+    return ":".join(parts)
+
+
+def get_value_key(key: str, serializer: Optional[str] = None) -> str:
+    """
+    Key the value of key is stored under, serializer is CACHE_SERIALIZER by default.
+    Processes with another CACHE_SERIALIZER, e.g. during a rolling deploy, don't read each other's items,
+    but share locks and generations.
+    """
+    return f"{key}:{serializer or settings.CACHE_SERIALIZER}"
+
+
+def get_generation_key(value: Any) -> str:
+    """Generation of cached values computed from value, e.g. of every score of an accommodation."""
+    return get_cache_key("generation", value)
+
+
+async def increment_generation(cache: AbstractCache, key: str) -> None:
+    """Values being computed with the previous generation are not written, see cache_handler generation_arg."""
+    await cache.increment(key, settings.SCORE_CACHE_MAX_LIFETIME)
+
+
+CACHEABLE_ERRORS: dict[str, type[Exception]] = {error.__name__: error for error in (ScoreNotFoundError, LogarithmError)}
+
+
+class CacheSerializer(ABC):
+    """Dumped entries are prefixed with format, entries of other formats are not loaded."""
+
+    format: bytes
+
+    @abstractmethod
+    def dumps(self, entry: CacheEntry) -> bytes:
+        pass
+
+    @abstractmethod
+    def loads(self, data: bytes) -> CacheEntry:
+        pass
+
+
+class JSONSerializer(CacheSerializer):
+    """
+    Compact [value, stale_at] or [error args, stale_at, error name] for negative entries,
+    only errors of CACHEABLE_ERRORS are stored, stale_at is null if the entry does not get stale.
+    """
+
+    format = b"j"
+    encoder = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+    decoder = json.JSONDecoder()
+
+    def dumps(self, entry: CacheEntry) -> bytes:
+        stale_at = None if entry.stale_at == inf else entry.stale_at
+        if entry.is_error:
+            error_name = type(entry.value).__name__
+            if CACHEABLE_ERRORS.get(error_name) is not type(entry.value):
+                raise TypeError(f"{error_name} is not in CACHEABLE_ERRORS")
+            item = [entry.value.args, stale_at, error_name]
+        else:
+            item = [entry.value, stale_at]
+        return self.encoder.encode(item).encode()
+
+    def loads(self, data: bytes) -> CacheEntry:
+        """raise: ValueError."""
+        value, stale_at, *error_name = self.decoder.decode(data.decode())
+        if error_name:
+            if error_name[0] not in CACHEABLE_ERRORS:
+                raise ValueError(f"Unexpected error {error_name[0]}")
+            value = CACHEABLE_ERRORS[error_name[0]](*value)
+        return CacheEntry(value, inf if stale_at is None else stale_at)
+
+
+class PickleSerializer(CacheSerializer):
+    """Any value, cache entries are trusted as loading them runs code."""
+
+    format = b"p"
+
+    def dumps(self, entry: CacheEntry) -> bytes:
+        return pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes) -> CacheEntry:
+        return pickle.loads(data)
+
+
+CACHE_SERIALIZERS: dict[str, type[CacheSerializer]] = {"json": JSONSerializer, "pickle": PickleSerializer}
+
+
+@lru_cache
+def get_cache_serializer() -> CacheSerializer:
+    return CACHE_SERIALIZERS[settings.CACHE_SERIALIZER]()
+
+
+def load_cache_item(item: bytes) -> Optional[CacheEntry]:
+    """return: None if the item was dumped by another serializer or is broken."""
+    serializer = get_cache_serializer()
+    if item[:1] != serializer.format:
+        return None
+    try:
+        entry = serializer.loads(item[1:])
+    except Exception:
+        # pickle raises UnpicklingError, EOFError, AttributeError and others on broken items
+        logging.warning("Cache item could not be loaded: %r", item[:100])
+        return None
+    return entry if isinstance(entry, CacheEntry) else None
+
+
+def dump_cache_item(entry: CacheEntry) -> bytes:
+    serializer = get_cache_serializer()
+    return serializer.format + serializer.dumps(entry)
+
+
+async def get_cached_items(cache: AbstractCache, keys: list[str]) -> list[Any]:
+    """
+    Entries from the local cache, the rest from cache with one request.
+    return: CacheEntry or MISSING for every key.
+    """
+    local_cache = get_local_cache() if settings.LOCAL_CACHE_ENABLED else None
+    entries = [MISSING if local_cache is None else local_cache.get(key) for key in keys]
+
+    missed_keys = [key for key, entry in zip(keys, entries) if entry is MISSING]
+    if not missed_keys:
+        return entries
+    value_keys = [get_value_key(key) for key in missed_keys]
+    items = await cache.get_many(value_keys) if len(value_keys) > 1 else [await cache.get(value_keys[0])]
+    loaded_entries = {}
+    for key, item in zip(missed_keys, items):
+        entry = load_cache_item(item) if item else None
+        if isinstance(entry, CacheEntry):
+            loaded_entries[key] = entry
+            if local_cache is not None:
+                local_cache.set(key, entry, entry.get_ttl())
+    return [loaded_entries.get(key, MISSING) if entry is MISSING else entry for key, entry in zip(keys, entries)]
+
+
+async def get_cached_item(cache: AbstractCache, key: str) -> Any:
+    """return: CacheEntry or MISSING."""
+    return (await get_cached_items(cache, [key]))[0]
+
+
+async def set_cached_item(
+    cache: AbstractCache,
+    key: str,
+    value: Any,
+    expire: Optional[int],
+    generation: Optional[tuple[str, str]] = None,
+) -> None:
+    """
+    Value is fresh for expire seconds, then it is served stale for CACHE_STALE_LIFETIME if it is not an error.
+    Value is dropped if generation, (key, generation) read before computing it, was incremented since.
+    """
+    entry = CacheEntry.build(value, expire)
+    ttl = entry.get_ttl()
+    if not await cache.set(key=get_value_key(key), value=dump_cache_item(entry), expire=ttl, generation=generation):
+        return
+    if settings.LOCAL_CACHE_ENABLED:
+        get_local_cache().set(key, entry, ttl)
+
+
+async def delete_cached_items(cache: AbstractCache, keys: list[str]) -> None:
+    """Values of every serializer are deleted."""
+    await cache.delete(*(get_value_key(key, serializer) for key in keys for serializer in CACHE_SERIALIZERS))
+    if settings.LOCAL_CACHE_ENABLED:
+        local_cache = get_local_cache()
+        for key in keys:
+            local_cache.delete(key)
+
+
+async def get_shared_cached_item(cache: AbstractCache, key: str) -> Any:
+    """
+    Entry written by any process, the local cache is skipped and updated with fresh entries.
+    return: CacheEntry or MISSING.
+    """
+    item = await cache.get(get_value_key(key))
+    entry = load_cache_item(item) if item else None
+    if not isinstance(entry, CacheEntry):
+        return MISSING
+    if settings.LOCAL_CACHE_ENABLED and not entry.is_stale():
+        get_local_cache().set(key, entry, entry.get_ttl())
+    return entry
+
+
+async def wait_for_cached_item(cache: AbstractCache, key: str) -> Any:
+    """
+    Polls cache while another process computes the value.
+    return: CacheEntry or MISSING after SINGLE_FLIGHT_WAIT_TIMEOUT.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    while loop.time() < deadline:
+        await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        entry = await get_shared_cached_item(cache, key)
+        if entry is not MISSING and not entry.is_stale():
+            return entry
+    return MISSING
+
+
+async def compute_cached_item(
+    cache: AbstractCache,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    expire: Optional[int],
+    negative_errors: tuple[type[Exception], ...] = (),
+    wait: bool = True,
+    stale_at: float = -inf,
+    generation_key: Optional[str] = None,
+) -> Any:
+    """
+    Only the process holding the lock computes the value, the others wait for it
+    and compute it themselves if it does not appear in time. The value is not computed
+    if a fresh entry getting stale after stale_at, the one of the caller, was written by another process.
+    The value is not cached if the generation of generation_key is incremented while it is computed.
+    Falsy results and negative_errors are cached for NEGATIVE_CACHE_LIFETIME,
+    expire is shortened by limit_cache_expiry calls made while computing.
+    return: value or MISSING if the lock is held by another process and wait is False.
+    """
+    lock_key = f"{key}:lock"
+    token = None
+    if settings.SINGLE_FLIGHT_LOCK_ENABLED:
+        token = await cache.acquire_lock(lock_key, settings.SINGLE_FLIGHT_LOCK_TIMEOUT)
+        if token is None:
+            if not wait:
+                return MISSING
+            entry = await wait_for_cached_item(cache, key)
+            if entry is not MISSING:
+                return entry.get_value()
+
     try:
-        yield cache
+        if token is not None or not wait:
+            entry = await get_shared_cached_item(cache, key)
+            if entry is not MISSING and not entry.is_stale() and entry.stale_at > stale_at:
+                return entry.get_value()
+
+        generation = None
+        if generation_key is not None:
+            generation = (generation_key, await cache.get_generation(generation_key))
+        expiry = CacheExpiry()
+        expiry_token = cache_expiry.set(expiry)
+        try:
+            result = await compute()
+        except negative_errors as error:
+            await set_cached_item(cache, key, error, expiry.limit(settings.NEGATIVE_CACHE_LIFETIME), generation)
+            raise
+        finally:
+            cache_expiry.reset(expiry_token)
+        result_expire = expiry.limit(expire if result else settings.NEGATIVE_CACHE_LIFETIME)
+        await set_cached_item(cache, key, result, result_expire, generation)
+        return result
     finally:
-        await cache.close()
+        if token is not None:
+            await cache.release_lock(lock_key, token)
 
 
-CacheDependancy = Annotated[CacheRedis, Depends(get_cache)]
+def needs_refresh(entry: CacheEntry) -> bool:
+    if entry.is_stale():
+        return True
+    return settings.CACHE_REFRESH_AHEAD_ENABLED and entry.stale_at - time() < settings.CACHE_REFRESH_AHEAD_WINDOW
 
 
-def cache_handler(name: str, expire: Optional[int] = settings.CACHE_LIFETIME) -> Callable[[Any], Any]:
+def cache_handler(
+    name: str,
+    expire: Optional[int] = settings.CACHE_LIFETIME,
+    negative_errors: tuple[type[Exception], ...] = (ScoreNotFoundError,),
+    generation_arg: Optional[str] = None,
+) -> Callable[[Any], Any]:
+    """
+    Caches results of a method of a class with cache attribute,
+    the local cache is checked before it if LOCAL_CACHE_ENABLED.
+    Falsy results and negative_errors are cached for NEGATIVE_CACHE_LIFETIME, the error is raised again on hit.
+    Concurrent misses of the same key are computed once, see compute_cached_item.
+    Stale entries and, if CACHE_REFRESH_AHEAD_ENABLED, entries close to getting stale
+    are returned as is while they are recomputed in background.
+    Results computed while the generation of the generation_arg argument is incremented are not cached.
+    Arguments are bound to the signature, so positional and keyword calls share the key.
+    Decorated method gets get_cache_key(*args, **kwargs) returning the key of a call without self
+    and refresh(*args, **kwargs) computing the value only if no other process computes it.
+    """
+
     def decorator(func: Callable) -> Callable[[Any], Any]:
-        @wraps(func)
-        async def wrapper(*args, **kwargs) -> Any:
-            if not settings.CACHE_ENABLED:
+        signature = inspect.signature(func)
+
+        def bind_arguments(*args, **kwargs) -> dict[str, Any]:
+            bound_arguments = signature.bind(*args, **kwargs)
+            bound_arguments.apply_defaults()
+            return bound_arguments.arguments
+
+        def get_call_cache_key(*args, **kwargs) -> str:
+            return get_cache_key(name, *list(bind_arguments(*args, **kwargs).values())[1:])
+
+        async def timed_func(*args, **kwargs) -> Any:
+            with CACHE_COMPUTE_SECONDS.time(cache=name):
                 return await func(*args, **kwargs)
+
+        def get_call_compute(*args, **kwargs) -> tuple[str, Callable[..., Awaitable[Any]]]:
+            """return: key, compute_cached_item of the call."""
             cache = getattr(args[0], "cache", None)
 
             if cache is None:
                 raise ValueError("class does not have redis")
 
-            key = hash(f"{name}{str(args[1:])}{kwargs}")
+            arguments = bind_arguments(*args, **kwargs)
+            key = get_cache_key(name, *list(arguments.values())[1:])
+            compute = partial(
+                compute_cached_item,
+                cache,
+                key,
+                partial(timed_func, *args, **kwargs),
+                expire,
+                negative_errors,
+                generation_key=None if generation_arg is None else get_generation_key(arguments[generation_arg]),
+            )
+            return key, compute
 
-            item = await cache.get(key)
-            if item:
-                return pickle.loads(item)
+        async def refresh(*args, **kwargs) -> Any:
+            """return: value or MISSING if another process computes it."""
+            if not settings.CACHE_ENABLED:
+                return await timed_func(*args, **kwargs)
+            key, compute = get_call_compute(*args, **kwargs)
+            return await get_single_flight().run(key, partial(compute, wait=False))
 
-            result = await func(*args, **kwargs)
-            if result:
-                await cache.set(key=key, value=pickle.dumps(result), expire=expire)
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            if not settings.CACHE_ENABLED:
+                return await timed_func(*args, **kwargs)
+            key, compute = get_call_compute(*args, **kwargs)
+            cache = args[0].cache
+            entry = await get_cached_item(cache, key)
+            if entry is not MISSING and not (entry.is_error and entry.is_stale()):
+                (CACHE_STALE if entry.is_stale() else CACHE_HITS).inc(cache=name)
+                if needs_refresh(entry):
+                    get_single_flight().run_in_background(key, partial(compute, wait=False, stale_at=entry.stale_at))
+                return entry.get_value()
 
-            return result
+            CACHE_MISSES.inc(cache=name)
+            return await get_single_flight().run(key, compute)
 
+        wrapper.get_cache_key = partial(get_call_cache_key, None)
+        wrapper.refresh = refresh
         return wrapper
 
     return decorator
@@ -0,0 +1,138 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from src.core.exceptions import LogarithmError
+
+MICROSECONDS_IN_DAY = 24 * 60 * 60 * 10**6
+
+
+def to_utc_datetime64(value: datetime) -> np.datetime64:
+    return np.datetime64(value.astimezone(timezone.utc).replace(tzinfo=None), "us")
+
+
+def parse_created_at(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class ReviewsColumns:
+    """
+    Page of reviews as arrays. created_at is split into months since epoch
+    and microseconds since the beginning of that month.
+    """
+
+    def __init__(
+        self,
+        months: np.ndarray,
+        month_offsets: np.ndarray,
+        scores: np.ndarray,
+        mask: np.ndarray,
+    ) -> None:
+        self.months = months
+        self.month_offsets = month_offsets
+        self.scores = scores
+        self.mask = mask
+
+    @classmethod
+    def build(cls, reviews: list[dict], score_aspect: Optional[str] = None) -> "ReviewsColumns":
+        return cls.build_many(reviews, [score_aspect])[score_aspect]
+
+    @classmethod
+    def build_many(
+        cls,
+        reviews: list[dict],
+        score_aspects: list[Optional[str]],
+    ) -> dict[Optional[str], "ReviewsColumns"]:
+        """created_at is parsed once and shared by the columns of every score aspect, None is general score."""
+        created_at = np.array(
+            [to_utc_datetime64(parse_created_at(review["created_at"])) for review in reviews],
+            dtype="datetime64[us]",
+        )
+        months = created_at.astype("datetime64[M]")
+        month_offsets = (created_at - months).astype(np.int64)
+        months = months.astype(np.int64)
+
+        columns = {}
+        for score_aspect in score_aspects:
+            if score_aspect is None:
+                scores = np.array([review["general_score"] for review in reviews], dtype=np.float64)
+                mask = np.ones(len(reviews), dtype=bool)
+            else:
+                scores = np.array(
+                    [review["score_aspects"].get(score_aspect, 0) for review in reviews],
+                    dtype=np.float64,
+                )
+                mask = np.array([score_aspect in review["score_aspects"] for review in reviews], dtype=bool)
+            columns[score_aspect] = cls(months, month_offsets, scores, mask)
+        return columns
+
+    def __len__(self) -> int:
+        return int(self.mask.sum())
+
+
+def compute_months_amounts(now: datetime, months: np.ndarray, month_offsets: np.ndarray) -> np.ndarray:
+    """Same as ScoreService.compute_months_amount(now, created_at) for every review."""
+    now = to_utc_datetime64(now)
+    now_month = now.astype("datetime64[M]")
+    now_offset = (now - now_month).astype(np.int64)
+    days_in_month = ((now_month + 1).astype("datetime64[D]") - now_month.astype("datetime64[D]")).astype(np.int64)
+
+    # created_at moved to the month of now, the day is clipped to the end of the month like relativedelta does
+    shifted_offsets = (
+        np.minimum(month_offsets // MICROSECONDS_IN_DAY, days_in_month - 1) * MICROSECONDS_IN_DAY
+        + month_offsets % MICROSECONDS_IN_DAY
+    )
+    months_amounts = now_month.astype(np.int64) - months
+    is_past = (months_amounts > 0) | ((months_amounts == 0) & (month_offsets <= now_offset))
+    months_amounts -= is_past & (shifted_offsets > now_offset)
+    months_amounts += ~is_past & (shifted_offsets < now_offset)
+    return months_amounts
+
+
+def compute_weights(months_amounts: np.ndarray) -> np.ndarray:
+    """raise: LogarithmError."""
+    args = 25 - months_amounts
+    if args.size and args.min() <= 0:
+        raise LogarithmError(f"Argument={args.min()} was less than 0")
+    return np.log(args)
+
+
+def fold_new_scores(columns: ReviewsColumns, now: datetime) -> dict[int, tuple]:
+    """
+    return: dict[months: (score, weight).
+    raise: LogarithmError.
+    """
+    months_amounts = compute_months_amounts(now, columns.months[columns.mask], columns.month_offsets[columns.mask])
+    weights = compute_weights(months_amounts)
+    unique_months_amounts, inverse = np.unique(months_amounts, return_inverse=True)
+    weighted_scores = np.bincount(inverse, weights=weights * columns.scores[columns.mask])
+    weight_sums = np.bincount(inverse, weights=weights)
+    return {
+        int(months_amount): (float(weighted_score), float(weight_sum))
+        for months_amount, weighted_score, weight_sum in zip(unique_months_amounts, weighted_scores, weight_sums)
+    }
+
+
+def compute_next_change(columns: ReviewsColumns, now: datetime) -> Optional[float]:
+    """
+    Same as ScoreService.get_next_change for every review.
+    return: earliest unix time age in months of a review changes, None if there are no reviews.
+    """
+    months = columns.months[columns.mask]
+    if not months.size:
+        return None
+    month_offsets = columns.month_offsets[columns.mask]
+    next_months = (months + compute_months_amounts(now, months, month_offsets) + 1).astype("datetime64[M]")
+    days_in_month = ((next_months + 1).astype("datetime64[D]") - next_months.astype("datetime64[D]")).astype(np.int64)
+    next_month_offsets = (
+        np.minimum(month_offsets // MICROSECONDS_IN_DAY, days_in_month - 1) * MICROSECONDS_IN_DAY
+        + month_offsets % MICROSECONDS_IN_DAY
+    )
+    next_changes = next_months.astype("datetime64[us]").astype(np.int64) + next_month_offsets
+    return float(next_changes.min()) / 10**6
+
+
+def fold_old_scores(columns: ReviewsColumns) -> tuple[float, int]:
+    """return: score sum, amount."""
+    return float(columns.scores[columns.mask].sum()), len(columns)
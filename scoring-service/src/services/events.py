@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from typing import Optional
+from uuid import UUID
+
+import asyncpg
+
+from src.core.config import settings
+
+from .scoring import ScoreService
+
+
+class ReviewEventsListener:
+    """
+    Listens to review changes sent by data-service with NOTIFY and drops cached scores
+    of the accommodation, if REVIEW_EVENTS_RECOMPUTE the process getting the lock computes them again.
+    Notifications sent while disconnected are lost, such scores expire by TTL.
+    """
+
+    def __init__(self, score_service: ScoreService, dsn: str, channel: str) -> None:
+        self.score_service = score_service
+        self.dsn = dsn.replace("+asyncpg", "")
+        self.channel = channel
+        self.tasks: set[asyncio.Task] = set()
+
+    async def handle(self, payload: str) -> None:
+        try:
+            accommodation_id = UUID(payload)
+        except ValueError:
+            logging.warning("Unexpected %s payload: %s", self.channel, payload)
+            return
+
+        await self.score_service.invalidate(accommodation_id)
+        if settings.REVIEW_EVENTS_RECOMPUTE:
+            await self.score_service.recompute(accommodation_id)
+
+    def on_notification(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        task = asyncio.create_task(self.handle(payload))
+        self.tasks.add(task)
+        task.add_done_callback(self.on_handled)
+
+    def on_handled(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning("Review event was not handled: %s", task.exception())
+
+    async def listen(self) -> None:
+        """Returns when the connection is lost."""
+        connection = await asyncpg.connect(self.dsn)
+        terminated = asyncio.Event()
+        connection.add_termination_listener(lambda connection: terminated.set())
+        try:
+            await connection.add_listener(self.channel, self.on_notification)
+            await terminated.wait()
+        finally:
+            await connection.close()
+
+    async def run(self) -> None:
+        """Listens until cancelled, reconnecting after REVIEW_EVENTS_RECONNECT_INTERVAL whatever the error is."""
+        while True:
+            try:
+                await self.listen()
+                logging.warning("Connection to %s listener was lost", self.channel)
+            except (OSError, asyncpg.PostgresError) as error:
+                logging.warning("Could not listen to %s: %s", self.channel, error)
+            except Exception:
+                logging.exception("Could not listen to %s", self.channel)
+            await asyncio.sleep(settings.REVIEW_EVENTS_RECONNECT_INTERVAL)
+
+
+def get_review_events_listener(score_service: ScoreService) -> Optional[ReviewEventsListener]:
+    """return: None if REVIEW_EVENTS_DSN is not set."""
+    if settings.REVIEW_EVENTS_DSN is None:
+        return None
+    return ReviewEventsListener(score_service, settings.REVIEW_EVENTS_DSN, settings.REVIEW_EVENTS_CHANNEL)
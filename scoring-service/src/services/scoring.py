@@ -1,27 +1,44 @@
+import asyncio
+import json
+from collections import defaultdict
 from datetime import datetime, timezone
 from functools import lru_cache
 from math import log
-from typing import Annotated, Optional
+from time import time
+from typing import Annotated, AsyncIterator, Optional
 from uuid import UUID
 
 from dateutil.relativedelta import relativedelta
-from fastapi import Depends
-from src.core.client import CustomAsyncClient, get_custom_client
+from fastapi import Depends, status
+from src.core.client import CustomAsyncClient, StatusCodeNotOKError, get_custom_client
 from src.core.config import settings
-from src.schemas.scoring import ScoreIn
+from src.core.exceptions import LogarithmError, ScoreNotFoundError
+from src.core.metrics import DATA_SERVICE_PAGES, DATA_SERVICE_REVIEWS
+from src.schemas.scoring import ScoreAspects, ScoresInAdapter
 
-from .cache import CacheDependancy, CacheRedis, cache_handler
-
-
-class LogarithmError(Exception):
-    pass
-
-
-class ScoreNotFoundError(Exception):
-    pass
+from . import engine
+from .cache import (
+    MISSING,
+    CacheDependancy,
+    CacheExpiry,
+    CacheRedis,
+    cache_expiry,
+    cache_handler,
+    delete_cached_items,
+    get_cached_item,
+    get_cached_items,
+    get_generation_key,
+    increment_generation,
+    limit_cache_expiry,
+    needs_refresh,
+    set_cached_item,
+)
 
 
 class ScoreService:
+    NEXT_CURSOR_HEADER = "X-Next-Cursor"
+    REVIEW_FIELDS = "id,created_at,general_score,score_aspects"
+
     def __init__(self, client: CustomAsyncClient, cache: CacheRedis) -> None:
         self.client = client
         self.cache = cache
@@ -35,6 +52,19 @@ class ScoreService:
         months_in_year = 12
         return delta.years * months_in_year + delta.months
 
+    @staticmethod
+    def get_next_change(created_at: datetime, months_amount: int) -> datetime:
+        """Moment the age in months of a review becomes months_amount + 1."""
+        return created_at + relativedelta(months=months_amount + 1)
+
+    @staticmethod
+    def compute_weight(months_amount: int) -> float:
+        """raise: LogarithmError."""
+        arg = 25 - months_amount
+        if arg <= 0:
+            raise LogarithmError(f"Argument={arg} was less than 0")
+        return log(arg)
+
     async def _get_scores(
         self,
         accommodation_id: UUID,
@@ -42,71 +72,226 @@ class ScoreService:
         offset: int,
         limit: int,
         url: str = settings.DATA_SERVICE_ULR,
-    ) -> dict:
+    ) -> list[dict]:
         full_url = f"{url}/accommodations/{accommodation_id}/reviews"
         reviews = await self.client.get(
             full_url,
-            params={"offset": offset, "limit": limit, "status": "approved", "time_frame": time_frame},
+            params={
+                "offset": offset,
+                "limit": limit,
+                "status": "approved",
+                "time_frame": time_frame,
+                "fields": self.REVIEW_FIELDS,
+            },
         )
         return reviews
 
-    async def get_new_scores(
+    async def _get_scores_page(
         self,
         accommodation_id: UUID,
-        offset: int,
+        time_frame: str,
         limit: int,
+        cursor: Optional[str] = None,
+        url: str = settings.DATA_SERVICE_ULR,
+    ) -> tuple[list[dict], Optional[str]]:
+        """return: reviews, next page cursor."""
+        full_url = f"{url}/accommodations/{accommodation_id}/reviews"
+        params = {"limit": limit, "status": "approved", "time_frame": time_frame, "fields": self.REVIEW_FIELDS}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = await self.client.get_response(full_url, params=params)
+        return response.json(), response.headers.get(self.NEXT_CURSOR_HEADER)
+
+    async def _iter_scores_pages(
+        self,
+        accommodation_id: UUID,
+        time_frame: str,
+    ) -> AsyncIterator[list[dict]]:
+        if settings.SCORE_SOURCE == "stream":
+            source = "stream"
+            pages = self._iter_scores_stream(accommodation_id, time_frame)
+        elif settings.REVIEWS_PAGINATION == "cursor":
+            source = "cursor"
+            pages = self._iter_scores_pages_by_cursor(accommodation_id, time_frame)
+        else:
+            source = "offset"
+            pages = self._iter_scores_pages_by_offset(accommodation_id, time_frame)
+        async for page in pages:
+            DATA_SERVICE_PAGES.inc(source=source)
+            DATA_SERVICE_REVIEWS.inc(len(page), source=source)
+            yield page
+
+    async def _iter_scores_stream(
+        self,
+        accommodation_id: UUID,
+        time_frame: str,
+        url: str = settings.DATA_SERVICE_ULR,
+    ) -> AsyncIterator[list[dict]]:
+        """Reviews are parsed as they arrive and handed over by REVIEWS_STREAM_BATCH_SIZE."""
+        full_url = f"{url}/accommodations/{accommodation_id}/reviews/stream"
+        reviews = []
+        async for line in self.client.iter_lines(full_url, params={"status": "approved", "time_frame": time_frame}):
+            reviews.append(json.loads(line))
+            if len(reviews) == settings.REVIEWS_STREAM_BATCH_SIZE:
+                yield reviews
+                reviews = []
+        if reviews:
+            yield reviews
+
+    async def _iter_scores_pages_by_cursor(
+        self,
+        accommodation_id: UUID,
+        time_frame: str,
+    ) -> AsyncIterator[list[dict]]:
+        page, cursor = await self._get_scores_page(accommodation_id, time_frame, settings.REVIEWS_PAGE_SIZE)
+        while page:
+            yield page
+            if cursor is None:
+                return
+            page, cursor = await self._get_scores_page(
+                accommodation_id,
+                time_frame,
+                settings.REVIEWS_PAGE_SIZE,
+                cursor,
+            )
+
+    async def _iter_scores_pages_by_offset(
+        self,
+        accommodation_id: UUID,
+        time_frame: str,
+    ) -> AsyncIterator[list[dict]]:
+        """
+        First page is fetched alone, if it is full the next pages are fetched
+        by REVIEWS_FETCH_CONCURRENCY at once until a page is not full.
+        """
+        limit, concurrency = settings.REVIEWS_PAGE_SIZE, settings.REVIEWS_FETCH_CONCURRENCY
+        pages = [await self._get_scores(accommodation_id, time_frame, 0, limit)]
+        offset = limit
+        while True:
+            for page in pages:
+                if page:
+                    yield page
+                if len(page) < limit:
+                    return
+            pages = await asyncio.gather(
+                *(
+                    self._get_scores(accommodation_id, time_frame, offset + page_number * limit, limit)
+                    for page_number in range(concurrency)
+                ),
+            )
+            offset += concurrency * limit
+
+    @staticmethod
+    def get_review_scores(reviews: list[dict]) -> list[tuple[int, dict]]:
+        """general_score, score_aspects of every review, created_at is not parsed unless REVIEWS_FULL_VALIDATION."""
+        if settings.REVIEWS_FULL_VALIDATION:
+            return [(review.general_score, review.score_aspects) for review in ScoresInAdapter.validate_python(reviews)]
+        return [(review["general_score"], review["score_aspects"]) for review in reviews]
+
+    @staticmethod
+    def parse_reviews(reviews: list[dict]) -> list[tuple[datetime, int, dict]]:
+        """
+        created_at, general_score, score_aspects of every review.
+        Pages of data-service are trusted, they are validated by ScoreIn only if REVIEWS_FULL_VALIDATION.
+        """
+        if settings.REVIEWS_FULL_VALIDATION:
+            return [
+                (review.created_at, review.general_score, review.score_aspects)
+                for review in ScoresInAdapter.validate_python(reviews)
+            ]
+        return [
+            (engine.parse_created_at(review["created_at"]), review["general_score"], review["score_aspects"])
+            for review in reviews
+        ]
+
+    @classmethod
+    def get_new_scores(
+        cls,
+        reviews: list[dict],
         score_aspect: Optional[str] = None,
-    ) -> list[ScoreIn]:
-        new_scores = await self._get_scores(accommodation_id, "newer_than_2_years", offset, limit)
+    ) -> list[tuple[datetime, int]]:
+        """return: created_at, score of reviews having the score aspect."""
         if score_aspect is None:
-            return [ScoreIn(**new_score) for new_score in new_scores]
-        return [ScoreIn(**new_score) for new_score in new_scores if score_aspect in new_score["score_aspects"]]
+            return [(created_at, general_score) for created_at, general_score, _ in cls.parse_reviews(reviews)]
+        reviews = [review for review in reviews if score_aspect in review["score_aspects"]]
+        return [
+            (created_at, score_aspects[score_aspect]) for created_at, _, score_aspects in cls.parse_reviews(reviews)
+        ]
 
     async def compute_new_score(
         self,
         accommodation_id: UUID,
         score_aspect: Optional[str] = None,
-    ) -> dict[UUID, tuple]:
+    ) -> dict[int, tuple]:
         """
-        return: dict[uuid: (score, weight).
+        Reviews are folded by age in months as pages arrive.
+        return: dict[months: (score, weight).
         raise: LogarithmError.
         """
-        start, end = 0, 1000
-        new_scores = await self.get_new_scores(accommodation_id, start, end, score_aspect)
         new_scores_mapper = {}
-        while new_scores:
-            for new_score in new_scores:
+        async for reviews in self._iter_scores_pages(accommodation_id, "newer_than_2_years"):
+            if settings.SCORE_ENGINE == "numpy":
                 current_datetime = datetime.now(timezone.utc)
-                months_amount = self.compute_months_amount(current_datetime, new_score.created_at)
-                arg = 25 - months_amount
-                if arg <= 0:
-                    raise LogarithmError(f"Argument={arg} was less than 0")
-
-                score = new_score.general_score if score_aspect is None else new_score.score_aspects[score_aspect]
-                weigth = log(arg)
-                new_scores_mapper[new_score.id] = (weigth * score, weigth)
-            start = end + 1
-            end = end + 1000
-            new_scores = await self.get_new_scores(accommodation_id, start, end, score_aspect)
+                columns = engine.ReviewsColumns.build(reviews, score_aspect)
+                page_scores_mapper = engine.fold_new_scores(columns, current_datetime)
+                self.limit_cache_expiry(engine.compute_next_change(columns, current_datetime))
+            else:
+                page_scores_mapper = self.fold_new_scores(reviews, score_aspect)
+
+            self.merge_new_scores(new_scores_mapper, page_scores_mapper)
 
         return new_scores_mapper
 
-    async def get_old_scores(
+    @staticmethod
+    def merge_new_scores(new_scores_mapper: dict[int, tuple], page_scores_mapper: dict[int, tuple]) -> None:
+        for months_amount, (page_weighted_score, page_weight) in page_scores_mapper.items():
+            weighted_score, weight = new_scores_mapper.get(months_amount, (0, 0))
+            new_scores_mapper[months_amount] = (weighted_score + page_weighted_score, weight + page_weight)
+
+    def fold_new_scores(
         self,
-        accommodation_id: UUID,
-        offset: int,
-        limit: int,
+        reviews: list[dict],
+        score_aspect: Optional[str] = None,
+    ) -> dict[int, tuple]:
+        """
+        Cached result expires when age in months of a review changes.
+        return: dict[months: (score, weight).
+        raise: LogarithmError.
+        """
+        new_scores_mapper = {}
+        next_change = None
+        for created_at, score in self.get_new_scores(reviews, score_aspect):
+            current_datetime = datetime.now(timezone.utc)
+            months_amount = self.compute_months_amount(current_datetime, created_at)
+            weigth = self.compute_weight(months_amount)
+            weighted_score, weight_sum = new_scores_mapper.get(months_amount, (0, 0))
+            new_scores_mapper[months_amount] = (weighted_score + weigth * score, weight_sum + weigth)
+            review_next_change = self.get_next_change(created_at, months_amount)
+            next_change = review_next_change if next_change is None else min(next_change, review_next_change)
+        self.limit_cache_expiry(next_change.timestamp() if next_change else None)
+        return new_scores_mapper
+
+    @staticmethod
+    def limit_cache_expiry(next_change: Optional[float]) -> None:
+        if next_change is not None:
+            limit_cache_expiry(next_change)
+
+    @classmethod
+    def limit_undated_cache_expiry(cls) -> None:
+        """Sources without review dates don't tell when reviews get a month older."""
+        cls.limit_cache_expiry(time() + settings.SCORE_CACHE_UNDATED_LIFETIME)
+
+    @classmethod
+    def get_old_scores(
+        cls,
+        reviews: list[dict],
         score_aspect: Optional[str] = None,
     ) -> list[int]:
-        old_scores = await self._get_scores(accommodation_id, "older_than_2_years", offset, limit)
+        review_scores = cls.get_review_scores(reviews)
         if score_aspect is None:
-            return [ScoreIn(**old_score).general_score for old_score in old_scores]
+            return [general_score for general_score, _ in review_scores]
 
-        return [
-            ScoreIn(**old_score).score_aspects[score_aspect]
-            for old_score in old_scores
-            if score_aspect in old_score["score_aspects"]
-        ]
+        return [score_aspects[score_aspect] for _, score_aspects in review_scores if score_aspect in score_aspects]
 
     async def compute_old_score(
         self,
@@ -118,14 +303,15 @@ class ScoreService:
         return: score, weight.
         raise: ScoreNotFoundError.
         """
-        start, end, score_sum, amount = 0, 1000, 0, 0
-        old_scores = await self.get_old_scores(accommodation_id, start, end, score_aspect)
-        while old_scores:
-            score_sum += sum(old_scores)
-            amount += len(old_scores)
-            start = end + 1
-            end = end + 1000
-            old_scores = await self.get_old_scores(accommodation_id, start, end, score_aspect)
+        score_sum, amount = 0, 0
+        async for reviews in self._iter_scores_pages(accommodation_id, "older_than_2_years"):
+            if settings.SCORE_ENGINE == "numpy":
+                page_score_sum, page_amount = engine.fold_old_scores(engine.ReviewsColumns.build(reviews, score_aspect))
+            else:
+                old_scores = self.get_old_scores(reviews, score_aspect)
+                page_score_sum, page_amount = sum(old_scores), len(old_scores)
+            score_sum += page_score_sum
+            amount += page_amount
 
         if amount == 0:
             raise ScoreNotFoundError("Score was not found")
@@ -133,13 +319,101 @@ class ScoreService:
         weight = log(coefficient)
         return (score_sum / amount) * weight, weight
 
+    async def get_aggregates(
+        self,
+        accommodation_id: UUID,
+        score_aspect: Optional[str] = None,
+        url: str = settings.DATA_SERVICE_ULR,
+    ) -> dict:
+        # buckets are per calendar month, so months is the calendar month age of the reviews
+        endpoint = "buckets" if settings.SCORE_SOURCE == "buckets" else "aggregates"
+        full_url = f"{url}/accommodations/{accommodation_id}/reviews/{endpoint}"
+        params = {"status": "approved"}
+        if score_aspect is not None:
+            params["score_aspect"] = score_aspect
+        aggregates = await self.client.get(full_url, params=params)
+        DATA_SERVICE_PAGES.inc(source=endpoint)
+        reviews_amount = aggregates["old"]["count"] + sum(new_aggregate["count"] for new_aggregate in aggregates["new"])
+        DATA_SERVICE_REVIEWS.inc(reviews_amount, source=endpoint)
+        return aggregates
+
+    async def compute_aggregated_score(
+        self,
+        accommodation_id: UUID,
+        coefficient: float = 1.77,
+        score_aspect: Optional[str] = None,
+    ) -> tuple[tuple[float, float], dict[int, tuple]]:
+        """
+        Same result as compute_old_score and compute_new_score in one request,
+        new scores are weighted per month instead of per review.
+        return: (score, weight), dict[months: (score, weight)].
+        raise: ScoreNotFoundError, LogarithmError.
+        """
+        aggregates = await self.get_aggregates(accommodation_id, score_aspect)
+        if settings.SCORE_SOURCE == "buckets":
+            current_month = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            self.limit_cache_expiry((current_month + relativedelta(months=1)).timestamp())
+        else:
+            self.limit_undated_cache_expiry()
+        old_aggregate = aggregates["old"]
+        if old_aggregate["count"] == 0:
+            raise ScoreNotFoundError("Score was not found")
+
+        weight = log(coefficient)
+        old_score = (old_aggregate["sum"] / old_aggregate["count"]) * weight, weight
+
+        new_scores_mapper = {}
+        for new_aggregate in aggregates["new"]:
+            months_weight = self.compute_weight(new_aggregate["months"])
+            new_scores_mapper[new_aggregate["months"]] = (
+                months_weight * new_aggregate["sum"],
+                months_weight * new_aggregate["count"],
+            )
+        return old_score, new_scores_mapper
+
+    async def get_materialized_score(
+        self,
+        accommodation_id: UUID,
+        url: str = settings.DATA_SERVICE_ULR,
+    ) -> dict:
+        """
+        Scores precomputed by data-service.
+        raise: ScoreNotFoundError.
+        """
+        full_url = f"{url}/accommodations/{accommodation_id}/score"
+        try:
+            score = await self.client.get(full_url)
+        except StatusCodeNotOKError as error:
+            if error.status_code == status.HTTP_404_NOT_FOUND:
+                raise ScoreNotFoundError("Score was not found")
+            raise
+        DATA_SERVICE_PAGES.inc(source="materialized")
+        self.limit_undated_cache_expiry()
+        return score
+
     async def compute_overall_score(
         self,
         accommodation_id: UUID,
         score_aspect: Optional[str] = None,
     ) -> dict:
-        weighted_old_score, weight = await self.compute_old_score(accommodation_id, score_aspect=score_aspect)
-        weighted_new_scores = await self.compute_new_score(accommodation_id, score_aspect=score_aspect)
+        if settings.SCORE_SOURCE == "materialized":
+            score = await self.get_materialized_score(accommodation_id)
+            if score_aspect is None:
+                return {"general_score": score["general_score"]}
+            if score_aspect not in score["score_aspects"]:
+                raise ScoreNotFoundError("Score was not found")
+            return {score_aspect: score["score_aspects"][score_aspect]}
+
+        if settings.SCORE_SOURCE in ("aggregates", "buckets"):
+            (weighted_old_score, weight), weighted_new_scores = await self.compute_aggregated_score(
+                accommodation_id,
+                score_aspect=score_aspect,
+            )
+        else:
+            (weighted_old_score, weight), weighted_new_scores = await asyncio.gather(
+                self.compute_old_score(accommodation_id, score_aspect=score_aspect),
+                self.compute_new_score(accommodation_id, score_aspect=score_aspect),
+            )
         numerator = weighted_old_score
         denominator = weight
         for weighted_new_score, weight in weighted_new_scores.values():
@@ -151,14 +425,163 @@ class ScoreService:
 
         return {score_aspect: round(result, 2)}
 
-    @cache_handler("general_score", 60 * 60 * 3)
+    @staticmethod
+    def get_review_score(general_score: int, score_aspects: dict, score_aspect: Optional[str] = None) -> Optional[int]:
+        if score_aspect is None:
+            return general_score
+        return score_aspects.get(score_aspect)
+
+    def fold_all_new_scores(
+        self,
+        reviews: list[dict],
+        score_aspects: list[Optional[str]],
+    ) -> dict[Optional[str], dict[int, tuple]]:
+        """
+        Every review is parsed and weighted once for all score aspects.
+        return: dict[score_aspect: dict[months: (score, weight)]].
+        raise: LogarithmError.
+        """
+        new_scores_mappers = {score_aspect: {} for score_aspect in score_aspects}
+        next_change = None
+        for created_at, general_score, score_aspects_scores in self.parse_reviews(reviews):
+            current_datetime = datetime.now(timezone.utc)
+            months_amount = self.compute_months_amount(current_datetime, created_at)
+            weigth = self.compute_weight(months_amount)
+            review_next_change = self.get_next_change(created_at, months_amount)
+            next_change = review_next_change if next_change is None else min(next_change, review_next_change)
+            for score_aspect, new_scores_mapper in new_scores_mappers.items():
+                score = self.get_review_score(general_score, score_aspects_scores, score_aspect)
+                if score is None:
+                    continue
+                weighted_score, weight_sum = new_scores_mapper.get(months_amount, (0, 0))
+                new_scores_mapper[months_amount] = (weighted_score + weigth * score, weight_sum + weigth)
+        self.limit_cache_expiry(next_change.timestamp() if next_change else None)
+        return new_scores_mappers
+
+    def fold_all_old_scores(
+        self,
+        reviews: list[dict],
+        score_aspects: list[Optional[str]],
+    ) -> dict[Optional[str], tuple]:
+        """return: dict[score_aspect: (score sum, amount)]."""
+        old_scores_mapper = {score_aspect: (0, 0) for score_aspect in score_aspects}
+        for general_score, score_aspects_scores in self.get_review_scores(reviews):
+            for score_aspect, (score_sum, amount) in old_scores_mapper.items():
+                score = self.get_review_score(general_score, score_aspects_scores, score_aspect)
+                if score is not None:
+                    old_scores_mapper[score_aspect] = (score_sum + score, amount + 1)
+        return old_scores_mapper
+
+    async def compute_all_new_scores(
+        self,
+        accommodation_id: UUID,
+        score_aspects: list[Optional[str]],
+    ) -> dict[Optional[str], dict[int, tuple]]:
+        """
+        return: dict[score_aspect: dict[months: (score, weight)]].
+        raise: LogarithmError.
+        """
+        new_scores_mappers = {score_aspect: {} for score_aspect in score_aspects}
+        async for reviews in self._iter_scores_pages(accommodation_id, "newer_than_2_years"):
+            if settings.SCORE_ENGINE == "numpy":
+                current_datetime = datetime.now(timezone.utc)
+                columns_mapper = engine.ReviewsColumns.build_many(reviews, score_aspects)
+                page_scores_mappers = {
+                    score_aspect: engine.fold_new_scores(columns, current_datetime)
+                    for score_aspect, columns in columns_mapper.items()
+                }
+                self.limit_cache_expiry(engine.compute_next_change(columns_mapper[None], current_datetime))
+            else:
+                page_scores_mappers = self.fold_all_new_scores(reviews, score_aspects)
+
+            for score_aspect, page_scores_mapper in page_scores_mappers.items():
+                self.merge_new_scores(new_scores_mappers[score_aspect], page_scores_mapper)
+
+        return new_scores_mappers
+
+    async def compute_all_old_scores(
+        self,
+        accommodation_id: UUID,
+        score_aspects: list[Optional[str]],
+    ) -> dict[Optional[str], tuple]:
+        """return: dict[score_aspect: (score sum, amount)]."""
+        old_scores_mapper = {score_aspect: (0, 0) for score_aspect in score_aspects}
+        async for reviews in self._iter_scores_pages(accommodation_id, "older_than_2_years"):
+            if settings.SCORE_ENGINE == "numpy":
+                page_scores_mapper = {
+                    score_aspect: engine.fold_old_scores(columns)
+                    for score_aspect, columns in engine.ReviewsColumns.build_many(reviews, score_aspects).items()
+                }
+            else:
+                page_scores_mapper = self.fold_all_old_scores(reviews, score_aspects)
+
+            for score_aspect, (page_score_sum, page_amount) in page_scores_mapper.items():
+                score_sum, amount = old_scores_mapper[score_aspect]
+                old_scores_mapper[score_aspect] = (score_sum + page_score_sum, amount + page_amount)
+
+        return old_scores_mapper
+
+    async def compute_all_scores(
+        self,
+        accommodation_id: UUID,
+        coefficient: float = 1.77,
+    ) -> dict:
+        """
+        General score and every score aspect from one pass over the reviews,
+        score aspects without old reviews are omitted.
+        raise: ScoreNotFoundError, LogarithmError.
+        """
+        score_aspects = [None, *(score_aspect.value for score_aspect in ScoreAspects)]
+        if settings.SCORE_SOURCE == "materialized":
+            score = await self.get_materialized_score(accommodation_id)
+            scores = {"general_score": score["general_score"]}
+            for score_aspect in score_aspects[1:]:
+                if score_aspect in score["score_aspects"]:
+                    scores[score_aspect] = score["score_aspects"][score_aspect]
+            return scores
+
+        if settings.SCORE_SOURCE in ("aggregates", "buckets"):
+            results = await asyncio.gather(
+                *(self.compute_overall_score(accommodation_id, score_aspect) for score_aspect in score_aspects),
+                return_exceptions=True,
+            )
+            scores = {}
+            for score_aspect, result in zip(score_aspects, results):
+                if isinstance(result, ScoreNotFoundError) and score_aspect is not None:
+                    continue
+                if isinstance(result, Exception):
+                    raise result
+                scores.update(result)
+            return scores
+
+        old_scores_mapper, new_scores_mappers = await asyncio.gather(
+            self.compute_all_old_scores(accommodation_id, score_aspects),
+            self.compute_all_new_scores(accommodation_id, score_aspects),
+        )
+        if old_scores_mapper[None][1] == 0:
+            raise ScoreNotFoundError("Score was not found")
+
+        weight = log(coefficient)
+        scores = {}
+        for score_aspect in score_aspects:
+            score_sum, amount = old_scores_mapper[score_aspect]
+            if amount == 0:
+                continue
+            numerator, denominator = (score_sum / amount) * weight, weight
+            for weighted_new_score, new_weight in new_scores_mappers[score_aspect].values():
+                numerator += weighted_new_score
+                denominator += new_weight
+            scores["general_score" if score_aspect is None else score_aspect] = round(numerator / denominator, 2)
+        return scores
+
+    @cache_handler("general_score", settings.SCORE_CACHE_MAX_LIFETIME, generation_arg="accommodation_id")
     async def get_general_score(
         self,
         accommodation_id: UUID,
     ) -> dict:
         return await self.compute_overall_score(accommodation_id)
 
-    @cache_handler("score_aspect", 60 * 60 * 3)
+    @cache_handler("score_aspect", settings.SCORE_CACHE_MAX_LIFETIME, generation_arg="accommodation_id")
     async def get_score_aspect(
         self,
         accommodation_id: UUID,
@@ -166,6 +589,147 @@ class ScoreService:
     ) -> dict:
         return await self.compute_overall_score(accommodation_id, score_aspect=score_aspect)
 
+    @cache_handler("all_scores", settings.SCORE_CACHE_MAX_LIFETIME, generation_arg="accommodation_id")
+    async def get_all_scores(
+        self,
+        accommodation_id: UUID,
+    ) -> dict:
+        return await self.compute_all_scores(accommodation_id)
+
+    async def get_score(
+        self,
+        accommodation_id: UUID,
+        score_aspect: Optional[str] = None,
+    ) -> dict:
+        if score_aspect is None:
+            return await self.get_general_score(accommodation_id)
+        return await self.get_score_aspect(accommodation_id, score_aspect)
+
+    async def invalidate(self, accommodation_id: UUID) -> None:
+        """
+        Removes every cached score of the accommodation, e.g. when its reviews change,
+        scores being computed from the previous reviews are not cached.
+        """
+        await increment_generation(self.cache, get_generation_key(accommodation_id))
+        await delete_cached_items(
+            self.cache,
+            [
+                self.get_general_score.get_cache_key(accommodation_id),
+                self.get_all_scores.get_cache_key(accommodation_id),
+                *(self.get_score_aspect.get_cache_key(accommodation_id, score_aspect) for score_aspect in ScoreAspects),
+            ],
+        )
+
+    async def recompute(self, accommodation_id: UUID) -> None:
+        """Computes the general score again unless another process is computing it."""
+        await self.get_general_score.refresh(self, accommodation_id)
+
+    async def has_fresh_scores(self, accommodation_id: UUID) -> bool:
+        """Whether scores cached by warm_scores don't need to be computed again yet."""
+        if not settings.CACHE_ENABLED:
+            return False
+        entry = await get_cached_item(self.cache, self.get_all_scores.get_cache_key(accommodation_id))
+        return entry is not MISSING and not needs_refresh(entry)
+
+    async def warm_scores(self, accommodation_id: UUID) -> dict:
+        """
+        Computes every score with one pass over the reviews and caches it under the keys
+        of get_all_scores, get_general_score and get_score_aspect.
+        raise: ScoreNotFoundError, LogarithmError.
+        """
+        all_scores_key = self.get_all_scores.get_cache_key(accommodation_id)
+        general_score_key = self.get_general_score.get_cache_key(accommodation_id)
+        generation_key = get_generation_key(accommodation_id)
+        generation = (generation_key, await self.cache.get_generation(generation_key))
+        expiry = CacheExpiry()
+        token = cache_expiry.set(expiry)
+        try:
+            try:
+                scores = await self.compute_all_scores(accommodation_id)
+            except ScoreNotFoundError as error:
+                expire = expiry.limit(settings.NEGATIVE_CACHE_LIFETIME)
+                await asyncio.gather(
+                    *(
+                        set_cached_item(self.cache, key, error, expire, generation)
+                        for key in (all_scores_key, general_score_key)
+                    )
+                )
+                raise
+        finally:
+            cache_expiry.reset(token)
+
+        expire = expiry.limit(settings.SCORE_CACHE_MAX_LIFETIME)
+        items = {all_scores_key: scores, general_score_key: {"general_score": scores["general_score"]}}
+        for score_aspect, score in scores.items():
+            if score_aspect != "general_score":
+                items[self.get_score_aspect.get_cache_key(accommodation_id, score_aspect)] = {score_aspect: score}
+        await asyncio.gather(
+            *(set_cached_item(self.cache, key, value, expire, generation) for key, value in items.items())
+        )
+        return scores
+
+    def get_score_cache_key(
+        self,
+        accommodation_id: UUID,
+        score_aspect: Optional[str] = None,
+    ):
+        if score_aspect is None:
+            return self.get_general_score.get_cache_key(accommodation_id)
+        return self.get_score_aspect.get_cache_key(accommodation_id, score_aspect)
+
+    async def get_batch_scores(
+        self,
+        accommodation_ids: list[UUID],
+        score_aspects: Optional[list[str]] = None,
+    ) -> tuple[dict[UUID, dict], dict[UUID, str]]:
+        """
+        Cache hits are read with one request, misses are computed by SCORE_BATCH_CONCURRENCY at once.
+        return: scores by accommodation id, errors by accommodation id.
+        """
+        score_requests = [
+            (accommodation_id, score_aspect)
+            for accommodation_id in dict.fromkeys(accommodation_ids)
+            for score_aspect in (score_aspects or [None])
+        ]
+        scores, errors = defaultdict(dict), {}
+
+        cached_scores = [MISSING] * len(score_requests)
+        if settings.CACHE_ENABLED:
+            cached_scores = await get_cached_items(
+                self.cache,
+                [self.get_score_cache_key(*score_request) for score_request in score_requests],
+            )
+
+        # stale entries are left to get_score, it returns them and refreshes them in background
+        missed_score_requests = []
+        for score_request, cached_score in zip(score_requests, cached_scores):
+            if cached_score is MISSING or cached_score.is_stale():
+                missed_score_requests.append(score_request)
+            elif cached_score.is_error:
+                errors.setdefault(score_request[0], str(cached_score.value))
+            else:
+                scores[score_request[0]].update(cached_score.value)
+
+        semaphore = asyncio.Semaphore(settings.SCORE_BATCH_CONCURRENCY)
+
+        async def compute_score(accommodation_id: UUID, score_aspect: Optional[str]) -> dict:
+            async with semaphore:
+                return await self.get_score(accommodation_id, score_aspect)
+
+        results = await asyncio.gather(
+            *(compute_score(*score_request) for score_request in missed_score_requests),
+            return_exceptions=True,
+        )
+        for (accommodation_id, _), result in zip(missed_score_requests, results):
+            if isinstance(result, (ScoreNotFoundError, LogarithmError, StatusCodeNotOKError, ConnectionError)):
+                errors.setdefault(accommodation_id, str(result))
+            elif isinstance(result, Exception):
+                errors.setdefault(accommodation_id, f"Unexpected error: {result}")
+            else:
+                scores[accommodation_id].update(result)
+
+        return dict(scores), errors
+
 
 @lru_cache
 def get_score_service(
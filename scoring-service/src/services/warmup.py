@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+from time import monotonic
+from typing import AsyncIterator, Iterable, NamedTuple, Optional, Union
+from uuid import UUID
+
+from src.core.config import settings
+from src.core.exceptions import ScoreNotFoundError
+
+from .cache import create_cache, get_cache_key
+from .scoring import ScoreService, get_score_service
+
+
+class WarmupResult(NamedTuple):
+    warmed: int
+    not_found: int
+    failed: int
+    fresh: int
+    elapsed: float
+
+
+class RateLimiter:
+    """Spaces calls of acquire so that at most rate of them pass per second, rate=0 disables the limit."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        async with self.lock:
+            now = monotonic()
+            if self.next_at > now:
+                await asyncio.sleep(self.next_at - now)
+            self.next_at = max(self.next_at, now) + self.interval
+
+
+def read_hot_list(path: Union[str, Path]) -> list[UUID]:
+    """Accommodation ids one per line, empty lines and lines starting with # are skipped."""
+    lines = (line.strip() for line in Path(path).read_text().splitlines())
+    return [UUID(line) for line in lines if line and not line.startswith("#")]
+
+
+class CacheWarmer:
+    """
+    Precomputes general and score aspect scores of accommodations into the cache,
+    warm_scores is called by concurrency workers at most rate_limit times per second.
+    Accommodations with fresh cached scores are skipped if skip_fresh.
+    """
+
+    def __init__(
+        self,
+        score_service: ScoreService,
+        concurrency: int,
+        rate_limit: float,
+        skip_fresh: bool = True,
+    ) -> None:
+        self.score_service = score_service
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.skip_fresh = skip_fresh
+
+    async def iter_accommodation_ids(
+        self,
+        page_size: int = 1000,
+        url: str = settings.DATA_SERVICE_ULR,
+    ) -> AsyncIterator[UUID]:
+        offset = 0
+        while True:
+            accommodations = await self.score_service.client.get(
+                f"{url}/accommodations",
+                params={"offset": offset, "limit": page_size},
+            )
+            for accommodation in accommodations:
+                yield UUID(accommodation["id"])
+            if len(accommodations) < page_size:
+                return
+            offset += page_size
+
+    async def warm(self, accommodation_ids: Union[Iterable[UUID], AsyncIterator[UUID]]) -> WarmupResult:
+        """Errors are logged and counted, warming goes on."""
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        counts = {"warmed": 0, "not_found": 0, "failed": 0, "fresh": 0}
+        started_at = monotonic()
+
+        async def work() -> None:
+            while (accommodation_id := await queue.get()) is not None:
+                try:
+                    if self.skip_fresh and await self.score_service.has_fresh_scores(accommodation_id):
+                        counts["fresh"] += 1
+                        continue
+                    await self.rate_limiter.acquire()
+                    await self.score_service.warm_scores(accommodation_id)
+                    counts["warmed"] += 1
+                except ScoreNotFoundError:
+                    counts["not_found"] += 1
+                except Exception as error:
+                    counts["failed"] += 1
+                    logging.warning("Scores of accommodation %s were not warmed: %s", accommodation_id, error)
+                finally:
+                    done = sum(counts.values())
+                    if done % settings.CACHE_WARMUP_PROGRESS_INTERVAL == 0:
+                        elapsed = monotonic() - started_at
+                        rate = done / max(elapsed, 1e-6)
+                        logging.info("Warmed %s accommodations in %.1fs, %.1f/s", done, elapsed, rate)
+
+        workers = [asyncio.create_task(work()) for _ in range(self.concurrency)]
+        try:
+            if isinstance(accommodation_ids, AsyncIterator):
+                async for accommodation_id in accommodation_ids:
+                    await queue.put(accommodation_id)
+            else:
+                for accommodation_id in accommodation_ids:
+                    await queue.put(accommodation_id)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        result = WarmupResult(**counts, elapsed=monotonic() - started_at)
+        logging.info(
+            "Cache warmup finished in %.1fs: %s warmed, %s without scores, %s failed, %s still fresh",
+            result.elapsed,
+            result.warmed,
+            result.not_found,
+            result.failed,
+            result.fresh,
+        )
+        return result
+
+
+async def warm_cache(
+    score_service: ScoreService,
+    hot_list: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    rate_limit: Optional[float] = None,
+    skip_fresh: bool = True,
+) -> WarmupResult:
+    """Warms accommodations of the hot list or, if it is not provided, every accommodation of data-service."""
+    warmer = CacheWarmer(
+        score_service,
+        concurrency or settings.CACHE_WARMUP_CONCURRENCY,
+        settings.CACHE_WARMUP_RATE_LIMIT if rate_limit is None else rate_limit,
+        skip_fresh,
+    )
+    if hot_list is not None:
+        return await warmer.warm(read_hot_list(hot_list))
+    return await warmer.warm(warmer.iter_accommodation_ids(settings.CACHE_WARMUP_PAGE_SIZE))
+
+
+async def run_startup_warmup(score_service: ScoreService) -> None:
+    """
+    Startup task, CACHE_WARMUP_HOT_LIST or every accommodation is warmed.
+    Only the worker getting the lock warms, the others skip it.
+    """
+    lock_key = get_cache_key("warmup", "lock")
+    token = await score_service.cache.acquire_lock(lock_key, settings.CACHE_WARMUP_LOCK_TIMEOUT)
+    if token is None:
+        logging.info("Cache warmup is run by another worker")
+        return
+    try:
+        await warm_cache(score_service, settings.CACHE_WARMUP_HOT_LIST)
+    except Exception:
+        logging.exception("Cache warmup failed")
+    finally:
+        await score_service.cache.release_lock(lock_key, token)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompute scores of accommodations into the cache.")
+    parser.add_argument("--hot-list", default=settings.CACHE_WARMUP_HOT_LIST, help="file with accommodation ids")
+    parser.add_argument("--concurrency", type=int, default=settings.CACHE_WARMUP_CONCURRENCY)
+    parser.add_argument("--rate-limit", type=float, default=settings.CACHE_WARMUP_RATE_LIMIT, help="per second")
+    parser.add_argument("--force", action="store_true", help="recompute scores that are still fresh")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if not settings.CACHE_ENABLED:
+        parser.exit(1, "CACHE_ENABLED is not set, there is nothing to warm\n")
+
+    cache = create_cache()
+    try:
+        await warm_cache(get_score_service(cache), args.hot_list, args.concurrency, args.rate_limit, not args.force)
+    finally:
+        await cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
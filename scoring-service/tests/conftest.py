@@ -11,6 +11,7 @@ from src.services.scoring import ScoreService
 test_app = create_app()
 test_app.dependency_overrides[get_cache] = lambda: Mock(CacheRedis)
 settings.CACHE_ENABLED = False
+settings.LOCAL_CACHE_ENABLED = False
 
 
 @pytest.fixture
@@ -0,0 +1,529 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, call
+from uuid import UUID, uuid4
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from src.core.config import settings
+from src.core.exceptions import LogarithmError, ScoreNotFoundError
+from src.main import create_app
+from src.schemas.scoring import ScoreAspects
+from src.services import cache as cache_module
+from src.services.cache import (
+    CACHE_SERIALIZERS,
+    MISSING,
+    CacheEntry,
+    CacheRedis,
+    JSONSerializer,
+    LocalCache,
+    PickleSerializer,
+    create_cache,
+    dump_cache_item,
+    get_cache_serializer,
+    get_generation_key,
+    get_local_cache,
+    get_value_key,
+    load_cache_item,
+)
+from src.services.scoring import ScoreService
+
+ACCOMMODATION_ID = UUID("123e4567-e89b-12d3-a456-426614174000")
+
+
+class TestCacheKeys:
+    async def test_cache_key_is_readable_and_stable(self, score_service: ScoreService):
+        key = score_service.get_score_aspect.get_cache_key(ACCOMMODATION_ID, ScoreAspects.FOOD)
+
+        assert key == "scoring:v1:score_aspect:123e4567-e89b-12d3-a456-426614174000:food"
+        assert key == score_service.get_score_aspect.get_cache_key(str(ACCOMMODATION_ID), score_aspect="food")
+
+    async def test_cache_key_changes_with_formula_version(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        key = score_service.get_general_score.get_cache_key(ACCOMMODATION_ID)
+        monkeypatch.setattr(settings, "SCORE_FORMULA_VERSION", 2)
+
+        assert score_service.get_general_score.get_cache_key(ACCOMMODATION_ID) == key.replace(":v1:", ":v2:")
+
+    async def test_only_value_key_changes_with_serializer(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        key = score_service.get_general_score.get_cache_key(ACCOMMODATION_ID)
+        generation_key = get_generation_key(ACCOMMODATION_ID)
+        value_key = get_value_key(key)
+        monkeypatch.setattr(settings, "CACHE_SERIALIZER", "pickle")
+
+        assert score_service.get_general_score.get_cache_key(ACCOMMODATION_ID) == key
+        assert get_generation_key(ACCOMMODATION_ID) == generation_key
+        assert value_key == f"{key}:json"
+        assert get_value_key(key) == f"{key}:pickle"
+
+    async def test_cached_method_uses_cache_key(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        score_service.cache.get.return_value = None
+        score_service.compute_overall_score = AsyncMock(return_value={"general_score": 8.5})
+
+        await score_service.get_general_score(accommodation_id=ACCOMMODATION_ID)
+
+        key = "scoring:v1:general_score:123e4567-e89b-12d3-a456-426614174000:json"
+        # the lock holder reads the key again before computing
+        assert score_service.cache.get.await_args_list == [call(key), call(key)]
+        assert score_service.cache.set.await_args.kwargs["key"] == key
+
+
+class TestCacheSerializer:
+    @pytest.mark.parametrize(
+        "entry",
+        [
+            CacheEntry({"general_score": 8.32}, 1700000000.5),
+            CacheEntry({"general_score": 8.32, "food": 7.9, "location": 10.0}, float("inf")),
+            CacheEntry({}, 1700000000.0),
+        ],
+    )
+    def test_json_round_trip(self, entry: CacheEntry):
+        item = dump_cache_item(entry)
+
+        assert item[:1] == JSONSerializer.format
+        assert load_cache_item(item) == entry
+
+    @pytest.mark.parametrize("error", [ScoreNotFoundError("Score was not found"), LogarithmError("Argument=-1")])
+    def test_json_round_trip_of_negative_entry(self, error: Exception):
+        entry = load_cache_item(dump_cache_item(CacheEntry(error, 1700000000.0)))
+
+        assert type(entry.value) is type(error)
+        assert entry.value.args == error.args
+        assert entry.stale_at == 1700000000.0
+
+    def test_json_does_not_store_unexpected_errors(self):
+        with pytest.raises(TypeError):
+            dump_cache_item(CacheEntry(ValueError("unexpected"), 1700000000.0))
+
+    @pytest.mark.parametrize(
+        "item",
+        [
+            PickleSerializer.format + PickleSerializer().dumps(CacheEntry({"general_score": 8.5}, 1700000000.0)),
+            JSONSerializer.format + b'[["rm -rf /"],null,"SystemExit"]',
+            JSONSerializer.format + b"not json",
+            b"",
+        ],
+    )
+    def test_unexpected_items_are_not_loaded(self, item: bytes):
+        assert load_cache_item(item) is None
+
+    @pytest.mark.parametrize("item", [PickleSerializer.format + b"garbage.", PickleSerializer.format + b"\x80\x05N"])
+    def test_broken_pickle_items_are_not_loaded(self, item: bytes, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "CACHE_SERIALIZER", "pickle")
+        get_cache_serializer.cache_clear()
+        try:
+            assert load_cache_item(item) is None
+        finally:
+            get_cache_serializer.cache_clear()
+
+
+class TestCachePool:
+    async def test_create_cache_configures_pool(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "REDIS_MAX_CONNECTIONS", 7)
+        monkeypatch.setattr(settings, "REDIS_SOCKET_TIMEOUT", 0.5)
+
+        cache = create_cache()
+
+        pool = cache.cache.connection_pool
+        assert pool.max_connections == 7
+        assert pool.connection_kwargs["socket_timeout"] == 0.5
+        assert pool.connection_kwargs["health_check_interval"] == settings.REDIS_HEALTH_CHECK_INTERVAL
+        await cache.close()
+
+    async def test_lifespan_shares_one_cache(self):
+        app = create_app()
+
+        async with app.router.lifespan_context(app):
+            cache = app.state.cache
+            assert isinstance(cache, CacheRedis)
+            cache.close = AsyncMock()
+
+        cache.close.assert_awaited_once()
+
+
+class TestLocalCache:
+    def test_evicts_least_recently_used(self):
+        local_cache = LocalCache(max_size=2, ttl=60)
+        local_cache.set("a", 1)
+        local_cache.set("b", 2)
+        local_cache.get("a")
+        local_cache.set("c", 3)
+
+        assert local_cache.get("b") is MISSING
+        assert (local_cache.get("a"), local_cache.get("c")) == (1, 3)
+        assert (local_cache.hits, local_cache.misses) == (3, 1)
+
+    def test_expires_entries(self, monkeypatch: pytest.MonkeyPatch):
+        now = 1000.0
+        monkeypatch.setattr(cache_module, "monotonic", lambda: now)
+        local_cache = LocalCache(max_size=10, ttl=60)
+        local_cache.set("a", 1)
+        local_cache.set("b", 2, expire=5)
+
+        now += 10
+
+        assert local_cache.get("a") == 1
+        assert local_cache.get("b") is MISSING
+        assert len(local_cache) == 1
+
+    async def test_cached_method_served_from_local_cache(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "LOCAL_CACHE_ENABLED", True)
+        get_local_cache().clear()
+        score_service.cache.get.return_value = dump_cache_item(CacheEntry.build({"general_score": 8.5}, 60))
+        score_service.compute_overall_score = AsyncMock()
+
+        scores = [await score_service.get_general_score(ACCOMMODATION_ID) for _ in range(3)]
+
+        assert scores == [{"general_score": 8.5}] * 3
+        score_service.cache.get.assert_awaited_once()
+        score_service.compute_overall_score.assert_not_awaited()
+        get_local_cache().clear()
+
+
+class TestSingleFlight:
+    async def test_concurrent_misses_computed_once(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        score_service.cache.get.return_value = None
+        score_service.cache.acquire_lock.return_value = "token"
+
+        async def compute_overall_score(accommodation_id, score_aspect=None):
+            await asyncio.sleep(0.01)
+            return {"general_score": 8.5}
+
+        score_service.compute_overall_score = AsyncMock(side_effect=compute_overall_score)
+
+        scores = await asyncio.gather(*(score_service.get_general_score(ACCOMMODATION_ID) for _ in range(5)))
+
+        assert scores == [{"general_score": 8.5}] * 5
+        score_service.compute_overall_score.assert_awaited_once()
+        score_service.cache.set.assert_awaited_once()
+        score_service.cache.release_lock.assert_awaited_once_with(
+            "scoring:v1:general_score:123e4567-e89b-12d3-a456-426614174000:lock",
+            "token",
+        )
+
+    async def test_waits_for_other_process(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "SINGLE_FLIGHT_POLL_INTERVAL", 0)
+        cached_score = dump_cache_item(CacheEntry.build({"general_score": 8.5}, 60))
+        score_service.cache.get.side_effect = [None, None, cached_score]
+        score_service.cache.acquire_lock.return_value = None
+        score_service.compute_overall_score = AsyncMock()
+
+        assert await score_service.get_general_score(ACCOMMODATION_ID) == {"general_score": 8.5}
+        score_service.compute_overall_score.assert_not_awaited()
+        score_service.cache.release_lock.assert_not_awaited()
+
+    async def test_lock_holder_returns_value_written_before_it_got_lock(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        cached_score = dump_cache_item(CacheEntry.build({"general_score": 8.5}, 60))
+        score_service.cache.get.side_effect = [None, cached_score]
+        score_service.cache.acquire_lock.return_value = "token"
+        score_service.compute_overall_score = AsyncMock()
+
+        assert await score_service.get_general_score(ACCOMMODATION_ID) == {"general_score": 8.5}
+        score_service.compute_overall_score.assert_not_awaited()
+        score_service.cache.set.assert_not_awaited()
+        score_service.cache.release_lock.assert_awaited_once()
+
+    async def test_computes_if_other_process_is_too_slow(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "SINGLE_FLIGHT_WAIT_TIMEOUT", 0.01)
+        monkeypatch.setattr(settings, "SINGLE_FLIGHT_POLL_INTERVAL", 0)
+        score_service.cache.get.return_value = None
+        score_service.cache.acquire_lock.return_value = None
+        score_service.compute_overall_score = AsyncMock(return_value={"general_score": 8.5})
+
+        assert await score_service.get_general_score(ACCOMMODATION_ID) == {"general_score": 8.5}
+        score_service.compute_overall_score.assert_awaited_once()
+
+
+class TestStaleWhileRevalidate:
+    async def test_stale_entry_served_and_refreshed_in_background(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        score_service.cache.get.return_value = dump_cache_item(CacheEntry({"general_score": 7.0}, stale_at=0))
+        score_service.cache.acquire_lock.return_value = "token"
+        score_service.compute_overall_score = AsyncMock(return_value={"general_score": 8.5})
+
+        scores = [await score_service.get_general_score(ACCOMMODATION_ID) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        assert scores == [{"general_score": 7.0}] * 3
+        score_service.compute_overall_score.assert_awaited_once()
+        entry = score_service.cache.set.await_args.kwargs["value"]
+        assert cache_module.load_cache_item(entry).value == {"general_score": 8.5}
+        assert score_service.cache.set.await_args.kwargs["expire"] > 60 * 60 * 3
+
+    async def test_background_refresh_skipped_if_other_process_refreshes(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        score_service.cache.get.return_value = dump_cache_item(CacheEntry({"general_score": 7.0}, stale_at=0))
+        score_service.cache.acquire_lock.return_value = None
+        score_service.compute_overall_score = AsyncMock()
+
+        assert await score_service.get_general_score(ACCOMMODATION_ID) == {"general_score": 7.0}
+        await asyncio.sleep(0)
+
+        score_service.compute_overall_score.assert_not_awaited()
+
+    async def test_background_refresh_skipped_if_other_process_refreshed(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "LOCAL_CACHE_ENABLED", True)
+        key = score_service.get_general_score.get_cache_key(ACCOMMODATION_ID)
+        get_local_cache().set(key, CacheEntry({"general_score": 7.0}, stale_at=0))
+        refreshed_entry = CacheEntry.build({"general_score": 8.5}, 60)
+        score_service.cache.get.return_value = dump_cache_item(refreshed_entry)
+        score_service.cache.acquire_lock.return_value = "token"
+        score_service.compute_overall_score = AsyncMock()
+
+        assert await score_service.get_general_score(ACCOMMODATION_ID) == {"general_score": 7.0}
+        await asyncio.sleep(0)
+
+        score_service.compute_overall_score.assert_not_awaited()
+        assert get_local_cache().get(key) == refreshed_entry
+        get_local_cache().clear()
+
+    @pytest.mark.parametrize("refresh_ahead_enabled, refreshed", [(True, True), (False, False)])
+    async def test_refresh_ahead(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+        refresh_ahead_enabled: bool,
+        refreshed: bool,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "CACHE_REFRESH_AHEAD_ENABLED", refresh_ahead_enabled)
+        entry = CacheEntry.build({"general_score": 7.0}, settings.CACHE_REFRESH_AHEAD_WINDOW - 1)
+        score_service.cache.get.return_value = dump_cache_item(entry)
+        score_service.cache.acquire_lock.return_value = "token"
+        score_service.compute_overall_score = AsyncMock(return_value={"general_score": 8.5})
+
+        assert await score_service.get_general_score(ACCOMMODATION_ID) == {"general_score": 7.0}
+        await asyncio.sleep(0)
+
+        assert score_service.compute_overall_score.await_count == refreshed
+
+
+class TestNegativeCache:
+    async def test_not_found_cached_for_negative_lifetime(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        score_service.cache.get.return_value = None
+        score_service.compute_overall_score = AsyncMock(side_effect=ScoreNotFoundError("Score was not found"))
+
+        with pytest.raises(ScoreNotFoundError, match="Score was not found"):
+            await score_service.get_general_score(ACCOMMODATION_ID)
+
+        set_kwargs = score_service.cache.set.await_args.kwargs
+        assert set_kwargs["expire"] <= settings.NEGATIVE_CACHE_LIFETIME
+        score_service.cache.get.return_value = set_kwargs["value"]
+
+        with pytest.raises(ScoreNotFoundError, match="Score was not found"):
+            await score_service.get_general_score(ACCOMMODATION_ID)
+        score_service.compute_overall_score.assert_awaited_once()
+
+    async def test_stale_negative_entry_recomputed(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        entry = CacheEntry(ScoreNotFoundError("Score was not found"), stale_at=0)
+        score_service.cache.get.return_value = dump_cache_item(entry)
+        score_service.compute_overall_score = AsyncMock(return_value={"general_score": 8.5})
+
+        assert await score_service.get_general_score(ACCOMMODATION_ID) == {"general_score": 8.5}
+
+    async def test_batch_returns_cached_not_found(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        entry = CacheEntry.build(ScoreNotFoundError("Score was not found"), settings.NEGATIVE_CACHE_LIFETIME)
+        score_service.cache.get.return_value = dump_cache_item(entry)
+        score_service.compute_overall_score = AsyncMock()
+
+        assert await score_service.get_batch_scores([ACCOMMODATION_ID]) == (
+            {},
+            {ACCOMMODATION_ID: "Score was not found"},
+        )
+        score_service.compute_overall_score.assert_not_awaited()
+
+
+class TestCacheExpiry:
+    @pytest.mark.parametrize("score_engine", ["python", "numpy"])
+    async def test_expires_when_review_gets_month_older(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+        score_engine: str,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "SCORE_ENGINE", score_engine)
+        score_service.cache.get.return_value = None
+        score_service.compute_old_score = AsyncMock(return_value=(10.0, 2.0))
+        created_at = datetime.now(timezone.utc) - relativedelta(months=1) + timedelta(hours=1)
+
+        async def iter_scores_pages(accommodation_id, time_frame):
+            yield [{"id": str(uuid4()), "general_score": 8, "created_at": created_at.isoformat(), "score_aspects": {}}]
+
+        score_service._iter_scores_pages = iter_scores_pages
+
+        await score_service.get_general_score(ACCOMMODATION_ID)
+
+        entry = cache_module.load_cache_item(score_service.cache.set.await_args.kwargs["value"])
+        next_change = ScoreService.get_next_change(created_at, 0).timestamp()
+        assert entry.stale_at == pytest.approx(next_change, abs=2)
+
+    async def test_expires_after_max_lifetime_without_new_reviews(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        score_service.cache.get.return_value = None
+        score_service.compute_overall_score = AsyncMock(return_value={"general_score": 8.5})
+
+        await score_service.get_general_score(ACCOMMODATION_ID)
+
+        entry = cache_module.load_cache_item(score_service.cache.set.await_args.kwargs["value"])
+        assert entry.stale_at == pytest.approx(datetime.now().timestamp() + settings.SCORE_CACHE_MAX_LIFETIME, abs=2)
+
+    @pytest.mark.parametrize("score_source", ["aggregates", "materialized"])
+    async def test_sources_without_review_dates_expire_sooner(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+        score_source: str,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "SCORE_SOURCE", score_source)
+        score_service.cache.get.return_value = None
+        score_service.client.get = AsyncMock(
+            return_value={"old": {"sum": 8, "count": 1}, "new": [], "general_score": 8.0, "score_aspects": {}},
+        )
+
+        await score_service.get_general_score(ACCOMMODATION_ID)
+
+        entry = cache_module.load_cache_item(score_service.cache.set.await_args.kwargs["value"])
+        expected_stale_at = datetime.now().timestamp() + settings.SCORE_CACHE_UNDATED_LIFETIME
+        assert entry.stale_at == pytest.approx(expected_stale_at, abs=2)
+
+    async def test_expiry_is_not_left_in_context(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        score_service.cache.get.return_value = None
+        score_service.compute_overall_score = AsyncMock(return_value={"general_score": 8.5})
+
+        await cache_module.compute_cached_item(
+            score_service.cache,
+            "key",
+            score_service.compute_overall_score,
+            settings.SCORE_CACHE_MAX_LIFETIME,
+        )
+
+        assert cache_module.cache_expiry.get() is None
+
+    async def test_score_computed_before_invalidation_is_not_cached(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "LOCAL_CACHE_ENABLED", True)
+        get_local_cache().clear()
+        score_service.cache.get.return_value = None
+        score_service.cache.get_generation.return_value = "3"
+        score_service.cache.set.return_value = False
+        score_service.compute_overall_score = AsyncMock(return_value={"general_score": 8.5})
+
+        assert await score_service.get_general_score(ACCOMMODATION_ID) == {"general_score": 8.5}
+
+        generation_key = "scoring:v1:generation:123e4567-e89b-12d3-a456-426614174000"
+        score_service.cache.get_generation.assert_awaited_once_with(generation_key)
+        assert score_service.cache.set.await_args.kwargs["generation"] == (generation_key, "3")
+        assert len(get_local_cache()) == 0
+
+    async def test_write_checks_generation_in_redis(self):
+        redis = AsyncMock()
+        redis.eval.return_value = 0
+        cache = CacheRedis(redis)
+
+        assert not await cache.set("key", b"value", None, ("generation", "2"))
+        redis.eval.assert_awaited_once_with(
+            CacheRedis.SET_IF_GENERATION_SCRIPT, 2, "key", "generation", b"value", "", "2"
+        )
+        redis.set.assert_not_awaited()
+
+    async def test_invalidate_removes_every_score_of_accommodation(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "LOCAL_CACHE_ENABLED", True)
+        key = score_service.get_general_score.get_cache_key(ACCOMMODATION_ID)
+        get_local_cache().set(key, CacheEntry.build({"general_score": 8.5}, 60))
+
+        await score_service.invalidate(ACCOMMODATION_ID)
+
+        score_service.cache.increment.assert_awaited_once_with(
+            "scoring:v1:generation:123e4567-e89b-12d3-a456-426614174000",
+            settings.SCORE_CACHE_MAX_LIFETIME,
+        )
+        keys = score_service.cache.delete.await_args.args
+        assert len(keys) == (len(ScoreAspects) + 2) * len(CACHE_SERIALIZERS)
+        assert {get_value_key(key, "json"), get_value_key(key, "pickle")} <= set(keys)
+        assert get_value_key(score_service.get_score_aspect.get_cache_key(ACCOMMODATION_ID, ScoreAspects.FOOD)) in keys
+        assert get_local_cache().get(key) is MISSING
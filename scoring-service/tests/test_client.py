@@ -0,0 +1,245 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncByteStream, AsyncClient, ConnectError, MockTransport, Request, Response
+
+from src.core.client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CustomAsyncClient,
+    HedgingPolicy,
+    LoadBalancer,
+    StatusCodeNotOKError,
+)
+from src.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def no_retry_backoff(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "DATA_SERVICE_RETRY_BACKOFF", 0)
+
+
+def make_handler(*responses):
+    """Handler returning responses in order, exceptions are raised."""
+    requests = []
+
+    def handler(request: Request) -> Response:
+        requests.append(request)
+        response = responses[min(len(requests), len(responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    handler.requests = requests
+    return handler
+
+
+class TestCustomAsyncClient:
+    async def test_iter_lines_skips_empty_lines(self):
+        transport = MockTransport(lambda request: Response(200, content=b'{"a": 1}\n\n{"a": 2}\n'))
+        client = CustomAsyncClient(AsyncClient(transport=transport))
+
+        lines = [line async for line in client.iter_lines("http://test/stream")]
+
+        assert lines == ['{"a": 1}', '{"a": 2}']
+
+    async def test_iter_lines_if_status_code_not_ok(self):
+        def handler(request: Request) -> Response:
+            return Response(404)
+
+        client = CustomAsyncClient(AsyncClient(transport=MockTransport(handler)))
+
+        with pytest.raises(StatusCodeNotOKError, match="Unexpected return code: 404"):
+            [line async for line in client.iter_lines("http://test/stream")]
+
+    async def test_get_retries_server_errors(self):
+        handler = make_handler(Response(503), Response(200, json={"a": 1}))
+        client = CustomAsyncClient(AsyncClient(transport=MockTransport(handler)))
+
+        assert await client.get("http://test/reviews") == {"a": 1}
+        assert len(handler.requests) == 2
+
+    async def test_get_does_not_retry_client_errors(self):
+        handler = make_handler(Response(404))
+        client = CustomAsyncClient(AsyncClient(transport=MockTransport(handler)))
+
+        with pytest.raises(StatusCodeNotOKError):
+            await client.get("http://test/reviews")
+        assert len(handler.requests) == 1
+
+    async def test_get_raises_connection_error_after_retries(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "DATA_SERVICE_RETRIES", 2)
+        handler = make_handler(ConnectError("connection refused"))
+        client = CustomAsyncClient(AsyncClient(transport=MockTransport(handler)))
+
+        with pytest.raises(ConnectionError, match="API not avaliable"):
+            await client.get("http://test/reviews")
+        assert len(handler.requests) == 3
+
+    async def test_iter_lines_not_retried_after_lines_received(self):
+        class BrokenStream(AsyncByteStream):
+            async def __aiter__(self):
+                yield b'{"a": 1}\n'
+                raise ConnectError("connection reset")
+
+        handler = make_handler(Response(200, stream=BrokenStream()))
+        client = CustomAsyncClient(AsyncClient(transport=MockTransport(handler)))
+        lines = []
+
+        with pytest.raises(ConnectionError):
+            async for line in client.iter_lines("http://test/stream"):
+                lines.append(line)
+        assert lines == ['{"a": 1}']
+        assert len(handler.requests) == 1
+
+    async def test_circuit_breaker_fails_fast(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "DATA_SERVICE_RETRIES", 0)
+        handler = make_handler(Response(500))
+        client = CustomAsyncClient(AsyncClient(transport=MockTransport(handler)), CircuitBreaker(2, 60))
+
+        for _ in range(2):
+            with pytest.raises(StatusCodeNotOKError):
+                await client.get("http://test/reviews")
+        with pytest.raises(CircuitOpenError):
+            await client.get("http://test/reviews")
+        assert len(handler.requests) == 2
+
+
+class TestCircuitBreaker:
+    def test_trial_request_after_recovery_timeout(self):
+        circuit_breaker = CircuitBreaker(1, 10)
+        with patch("src.core.client.monotonic", return_value=100):
+            circuit_breaker.record_failure()
+            assert not circuit_breaker.allow_request()
+
+        with patch("src.core.client.monotonic", return_value=111):
+            assert circuit_breaker.allow_request()
+            assert not circuit_breaker.allow_request()
+            circuit_breaker.record_success()
+
+        assert not circuit_breaker.is_open
+        assert circuit_breaker.allow_request()
+
+    def test_failed_trial_opens_breaker_again(self):
+        circuit_breaker = CircuitBreaker(1, 10)
+        with patch("src.core.client.monotonic", return_value=100):
+            circuit_breaker.record_failure()
+        with patch("src.core.client.monotonic", return_value=111):
+            assert circuit_breaker.allow_request()
+            circuit_breaker.record_failure()
+            assert not circuit_breaker.allow_request()
+
+
+class TestLoadBalancer:
+    def test_pick_endpoint_with_less_outstanding_requests(self):
+        load_balancer = LoadBalancer("http://data-service", ["http://replica-1", "http://replica-2"], 3, 30)
+        load_balancer.endpoints[0].outstanding = 2
+
+        with load_balancer.request("http://data-service/accommodations") as balanced_request:
+            assert balanced_request.url == "http://replica-2/accommodations"
+            assert load_balancer.endpoints[1].outstanding == 1
+            balanced_request.failed = False
+
+        assert load_balancer.endpoints[1].outstanding == 0
+
+    def test_failing_endpoint_is_ejected(self):
+        load_balancer = LoadBalancer("http://data-service", ["http://replica-1", "http://replica-2"], 2, 30)
+        failing_endpoint = load_balancer.endpoints[0]
+        for _ in range(2):
+            load_balancer.record(failing_endpoint, 0.1, failed=True)
+
+        assert failing_endpoint.ejected_until > 0
+        assert all(load_balancer.pick() is load_balancer.endpoints[1] for _ in range(10))
+
+    def test_latency_recorded_only_for_successful_requests(self):
+        load_balancer = LoadBalancer("http://data-service", ["http://replica-1"], 3, 30)
+        endpoint = load_balancer.endpoints[0]
+
+        load_balancer.record(endpoint, 0.5, failed=True)
+        assert endpoint.latency == 0
+
+        load_balancer.record(endpoint, 0.5, failed=False)
+        assert endpoint.latency == pytest.approx(0.5 * endpoint.LATENCY_DECAY)
+
+    def test_latency_measured_until_outcome(self):
+        load_balancer = LoadBalancer("http://data-service", ["http://replica-1"], 3, 30)
+
+        with load_balancer.request("http://data-service/accommodations/1/reviews/stream") as balanced_request:
+            balanced_request.finish(failed=False)
+            # the stream body is read after the headers arrived
+            time.sleep(0.05)
+
+        assert load_balancer.endpoints[0].latency < 0.01
+
+    def test_every_endpoint_used_if_all_ejected(self):
+        load_balancer = LoadBalancer("http://data-service", ["http://replica-1"], 1, 30)
+        load_balancer.record(load_balancer.endpoints[0], 0.1, failed=True)
+
+        assert load_balancer.pick() is load_balancer.endpoints[0]
+
+    def test_other_urls_are_not_balanced(self):
+        load_balancer = LoadBalancer("http://data-service", ["http://replica-1"], 1, 30)
+
+        with load_balancer.request("http://data-service-2/accommodations") as balanced_request:
+            assert balanced_request.url == "http://data-service-2/accommodations"
+            assert balanced_request.endpoint is None
+
+    async def test_retry_goes_to_other_endpoint(self):
+        handler = make_handler(Response(503), Response(200, json={"a": 1}))
+        load_balancer = LoadBalancer("http://data-service", ["http://replica-1", "http://replica-2"], 3, 30)
+        client = CustomAsyncClient(AsyncClient(transport=MockTransport(handler)), load_balancer=load_balancer)
+
+        assert await client.get("http://data-service/accommodations") == {"a": 1}
+        assert len({request.url.host for request in handler.requests}) == 2
+        assert sum(endpoint.failures for endpoint in load_balancer.endpoints) == 1
+
+
+class TestHedging:
+    @staticmethod
+    def make_hedging_policy(tokens: float) -> HedgingPolicy:
+        hedging_policy = HedgingPolicy(percentile=95, budget=0.05, min_samples=3)
+        for latency in (0.01, 0.01, 0.02):
+            hedging_policy.record(latency)
+        hedging_policy.tokens = tokens
+        return hedging_policy
+
+    @staticmethod
+    def make_slow_first_handler(requests: list):
+        async def handler(request: Request) -> Response:
+            requests.append(request)
+            if len(requests) == 1:
+                await asyncio.sleep(10)
+            return Response(200, json={"request": len(requests)})
+
+        return handler
+
+    def test_delay_is_percentile_of_recent_latencies(self):
+        hedging_policy = HedgingPolicy(percentile=50, budget=0.05, min_samples=3)
+        assert hedging_policy.get_delay() is None
+
+        for latency in (0.3, 0.1, 0.2):
+            hedging_policy.record(latency)
+        assert hedging_policy.get_delay() == 0.2
+
+    async def test_slow_request_is_hedged(self):
+        requests = []
+        client = CustomAsyncClient(
+            AsyncClient(transport=MockTransport(self.make_slow_first_handler(requests))),
+            hedging_policy=self.make_hedging_policy(tokens=1),
+        )
+
+        assert await asyncio.wait_for(client.get("http://test/reviews"), 1) == {"request": 2}
+        assert len(requests) == 2
+
+    async def test_hedging_is_limited_by_budget(self):
+        requests = []
+        client = CustomAsyncClient(
+            AsyncClient(transport=MockTransport(self.make_slow_first_handler(requests))),
+            hedging_policy=self.make_hedging_policy(tokens=0),
+        )
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.get("http://test/reviews"), 0.2)
+        assert len(requests) == 1
@@ -0,0 +1,94 @@
+import random
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from src.core.exceptions import LogarithmError
+from src.services import engine
+from src.services.scoring import ScoreService
+
+
+def make_random_reviews(now: datetime, amount: int, seed: int = 0) -> list[dict]:
+    rand = random.Random(seed)
+    reviews = []
+    for _ in range(amount):
+        created_at = now - timedelta(seconds=rand.randint(60, 2 * 365 * 24 * 60 * 60 - 60))
+        score_aspects = {"food": rand.randint(1, 10)} if rand.random() < 0.7 else {}
+        reviews.append(
+            {
+                "id": str(uuid4()),
+                "general_score": rand.randint(1, 10),
+                "created_at": created_at.isoformat(),
+                "score_aspects": score_aspects,
+            },
+        )
+    return reviews
+
+
+class TestEngine:
+    @pytest.mark.parametrize(
+        "now",
+        [
+            datetime(2024, 2, 29, 12, tzinfo=timezone.utc),
+            datetime(2024, 3, 31, 23, 59, tzinfo=timezone.utc),
+            datetime(2023, 1, 31, tzinfo=timezone.utc),
+            datetime(2024, 7, 15, 6, 30, tzinfo=timezone.utc),
+        ],
+    )
+    def test_compute_months_amounts_same_as_relativedelta(self, now: datetime):
+        rand = random.Random(1)
+        created_ats = [now + timedelta(hours=rand.randint(-3 * 365 * 24, 365 * 24)) for _ in range(2000)]
+        created_ats += [now.replace(day=1) - timedelta(days=day) for day in range(1, 120)]
+        columns = engine.ReviewsColumns.build(
+            [{"created_at": created_at.isoformat(), "general_score": 1} for created_at in created_ats],
+        )
+
+        months_amounts = engine.compute_months_amounts(now, columns.months, columns.month_offsets)
+
+        expected = [ScoreService.compute_months_amount(now, created_at) for created_at in created_ats]
+        assert months_amounts.tolist() == expected
+
+    @pytest.mark.parametrize("score_aspect", [None, "food", "pool"])
+    def test_fold_new_scores_same_as_python(self, score_service: ScoreService, score_aspect: str):
+        now = datetime.now(timezone.utc)
+        reviews = make_random_reviews(now, 5000)
+
+        expected = score_service.fold_new_scores(reviews, score_aspect)
+        result = engine.fold_new_scores(engine.ReviewsColumns.build(reviews, score_aspect), now)
+
+        assert result.keys() == expected.keys()
+        for months_amount, (weighted_score, weight) in expected.items():
+            assert result[months_amount] == pytest.approx((weighted_score, weight), rel=1e-9, abs=1e-9)
+
+    def test_fold_old_scores_same_as_python(self, score_service: ScoreService):
+        reviews = make_random_reviews(datetime(2020, 1, 1, tzinfo=timezone.utc), 1000)
+
+        old_scores = score_service.get_old_scores(reviews, "food")
+
+        columns = engine.ReviewsColumns.build(reviews, "food")
+        assert engine.fold_old_scores(columns) == (sum(old_scores), len(old_scores))
+
+    def test_compute_weights_if_argument_less_than_zero(self):
+        with pytest.raises(LogarithmError, match="Argument=-1 was less than 0"):
+            engine.compute_weights(np.array([3, 26]))
+
+    @pytest.mark.parametrize(
+        "now",
+        [datetime(2024, 1, 31, 12, tzinfo=timezone.utc), datetime(2024, 7, 15, 6, 30, tzinfo=timezone.utc)],
+    )
+    def test_compute_next_change_same_as_python(self, now: datetime):
+        reviews = make_random_reviews(now, 2000, seed=2)
+
+        next_change = engine.compute_next_change(engine.ReviewsColumns.build(reviews, "food"), now)
+
+        created_ats = [datetime.fromisoformat(review["created_at"]) for review in reviews if review["score_aspects"]]
+        expected = min(
+            ScoreService.get_next_change(created_at, ScoreService.compute_months_amount(now, created_at))
+            for created_at in created_ats
+        )
+        assert next_change == expected.timestamp()
+
+    def test_compute_next_change_without_reviews(self):
+        assert engine.compute_next_change(engine.ReviewsColumns.build([], "food"), datetime.now(timezone.utc)) is None
@@ -0,0 +1,107 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+from uuid import UUID
+
+import pytest
+
+from src import main
+from src.core.config import settings
+from src.services.events import ReviewEventsListener, get_review_events_listener
+from src.services.scoring import ScoreService
+
+ACCOMMODATION_ID = "123e4567-e89b-12d3-a456-426614174000"
+
+
+class TestReviewEventsListener:
+    async def test_review_change_invalidates_scores(self, score_service: ScoreService):
+        score_service.invalidate = AsyncMock()
+        score_service.get_general_score = AsyncMock()
+        listener = ReviewEventsListener(score_service, "postgresql+asyncpg://a:b@h/db", "review_changed")
+
+        await listener.handle(ACCOMMODATION_ID)
+
+        assert listener.dsn == "postgresql://a:b@h/db"
+        score_service.invalidate.assert_awaited_once_with(UUID(ACCOMMODATION_ID))
+        score_service.get_general_score.assert_not_awaited()
+
+    async def test_review_change_recomputes_general_score(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "REVIEW_EVENTS_RECOMPUTE", True)
+        score_service.invalidate = AsyncMock()
+        score_service.recompute = AsyncMock()
+        listener = ReviewEventsListener(score_service, "postgresql://a:b@h/db", "review_changed")
+
+        listener.on_notification(None, 1, "review_changed", ACCOMMODATION_ID)
+        await asyncio.gather(*listener.tasks)
+
+        score_service.recompute.assert_awaited_once_with(UUID(ACCOMMODATION_ID))
+
+    async def test_recompute_skipped_if_other_process_holds_lock(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        score_service.cache.acquire_lock.return_value = None
+        score_service.compute_overall_score = AsyncMock()
+
+        await score_service.recompute(UUID(ACCOMMODATION_ID))
+
+        score_service.compute_overall_score.assert_not_awaited()
+
+    async def test_unexpected_payload_ignored(self, score_service: ScoreService):
+        score_service.invalidate = AsyncMock()
+        listener = ReviewEventsListener(score_service, "postgresql://a:b@h/db", "review_changed")
+
+        await listener.handle("not-an-id")
+
+        score_service.invalidate.assert_not_awaited()
+
+    async def test_reconnects_after_connection_error(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "REVIEW_EVENTS_RECONNECT_INTERVAL", 0)
+        listener = ReviewEventsListener(score_service, "postgresql://a:b@h/db", "review_changed")
+        listener.listen = AsyncMock(side_effect=[OSError("connection refused"), None, asyncio.CancelledError()])
+
+        with pytest.raises(asyncio.CancelledError):
+            await listener.run()
+
+        assert listener.listen.await_count == 3
+
+    async def test_reconnects_after_unexpected_error(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "REVIEW_EVENTS_RECONNECT_INTERVAL", 0)
+        listener = ReviewEventsListener(score_service, "postgresql://a:b@h/db", "review_changed")
+        listener.listen = AsyncMock(side_effect=[asyncio.TimeoutError(), RuntimeError(), asyncio.CancelledError()])
+
+        with pytest.raises(asyncio.CancelledError):
+            await listener.run()
+
+        assert listener.listen.await_count == 3
+
+    async def test_failed_listener_does_not_break_shutdown(self, monkeypatch: pytest.MonkeyPatch):
+        listener = Mock(run=AsyncMock(side_effect=RuntimeError("listener failed")))
+        monkeypatch.setattr(main, "get_review_events_listener", lambda score_service: listener)
+        app = main.create_app()
+
+        async with app.router.lifespan_context(app):
+            cache = app.state.cache
+            cache.close = AsyncMock()
+            await asyncio.sleep(0)
+
+        listener.run.assert_awaited_once()
+        cache.close.assert_awaited_once()
+
+    def test_listener_disabled_without_dsn(self, score_service: ScoreService, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "REVIEW_EVENTS_DSN", None)
+
+        assert get_review_events_listener(score_service) is None
@@ -0,0 +1,87 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient
+
+from src.core.config import settings
+from src.core.metrics import CACHE_COMPUTE_SECONDS, CACHE_HITS, CACHE_MISSES, DATA_SERVICE_PAGES, MetricsRegistry
+from src.services.cache import CacheEntry, dump_cache_item
+from src.services.scoring import ScoreService
+
+ACCOMMODATION_ID = "123e4567-e89b-12d3-a456-426614174000"
+
+
+class TestMetricsRegistry:
+    def test_render_counter(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests.", ("path",))
+        counter.inc(path="/")
+        counter.inc(2, path='/"quoted"')
+
+        assert registry.render() == (
+            "# HELP requests_total Requests.\n"
+            "# TYPE requests_total counter\n"
+            'requests_total{path="/"} 1\n'
+            'requests_total{path="/\\"quoted\\""} 2\n'
+        )
+
+    def test_render_histogram(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("duration_seconds", "Duration.", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        assert registry.render() == (
+            "# HELP duration_seconds Duration.\n"
+            "# TYPE duration_seconds histogram\n"
+            'duration_seconds_bucket{le="0.1"} 1\n'
+            'duration_seconds_bucket{le="1"} 2\n'
+            'duration_seconds_bucket{le="+Inf"} 3\n'
+            "duration_seconds_sum 5.55\n"
+            "duration_seconds_count 3\n"
+        )
+
+    def test_unexpected_labels(self):
+        counter = MetricsRegistry().counter("requests_total", "Requests.", ("path",))
+
+        with pytest.raises(ValueError):
+            counter.inc(method="GET")
+
+
+class TestScoringMetrics:
+    async def test_cache_handler_counts_hits_and_misses(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "SINGLE_FLIGHT_LOCK_ENABLED", False)
+        score_service.compute_overall_score = AsyncMock(return_value={"general_score": 8.5})
+        hits, misses = CACHE_HITS.get(cache="general_score"), CACHE_MISSES.get(cache="general_score")
+        computes = CACHE_COMPUTE_SECONDS.get_count(cache="general_score")
+
+        score_service.cache.get.return_value = None
+        await score_service.get_general_score(ACCOMMODATION_ID)
+        score_service.cache.get.return_value = dump_cache_item(CacheEntry.build({"general_score": 8.5}, 60))
+        await score_service.get_general_score(ACCOMMODATION_ID)
+
+        assert CACHE_MISSES.get(cache="general_score") == misses + 1
+        assert CACHE_HITS.get(cache="general_score") == hits + 1
+        assert CACHE_COMPUTE_SECONDS.get_count(cache="general_score") == computes + 1
+
+    async def test_aggregates_are_counted(self, score_service: ScoreService, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "SCORE_SOURCE", "aggregates")
+        score_service.client.get = AsyncMock(return_value={"old": {"sum": 30, "count": 3}, "new": []})
+        pages = DATA_SERVICE_PAGES.get(source="aggregates")
+
+        await score_service.get_aggregates(ACCOMMODATION_ID)
+
+        assert DATA_SERVICE_PAGES.get(source="aggregates") == pages + 1
+
+    async def test_metrics_endpoint(self, client: AsyncClient):
+        response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE scoring_cache_hits_total counter" in response.text
@@ -1,11 +1,26 @@
+import json
+from datetime import datetime, timedelta, timezone
 from math import log
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, call
+from uuid import uuid4
 
+import httpx
 import pytest
+from pydantic import ValidationError
 
+from src.core.client import StatusCodeNotOKError
+from src.core.config import Settings, settings
+from src.services.cache import CacheEntry, dump_cache_item, get_value_key
 from src.services.scoring import ScoreNotFoundError, ScoreService
 
 
+def make_reviews(*scores: int, created_at: datetime = datetime(2020, 1, 1, tzinfo=timezone.utc)) -> list[dict]:
+    return [
+        {"id": str(uuid4()), "general_score": score, "created_at": created_at.isoformat(), "score_aspects": {}}
+        for score in scores
+    ]
+
+
 class TestScoring:
     async def test_compute_overall_score_if_score_not_found(self, score_service: ScoreService):
         score_service.compute_overall_score = AsyncMock(side_effect=ScoreNotFoundError("Score was not found"))
@@ -21,21 +36,240 @@ class TestScoring:
         assert result == {"general_score": 8.0}, "The computed overall score should be correct."
 
     async def test_compute_old_score_no_scores(self, score_service: ScoreService):
-        score_service.get_old_scores = AsyncMock(return_value=[])
+        score_service._get_scores_page = AsyncMock(return_value=([], None))
 
         with pytest.raises(ScoreNotFoundError, match="Score was not found"):
             await score_service.compute_old_score("123e4567-e89b-12d3-a456-426614174000")
 
-    async def test_compute_old_score_success(self, score_service: ScoreService):
-        score_service.get_old_scores = AsyncMock(
-            side_effect=[
-                [10, 15, 10, 15],
-                [20, 25],
-                [],
-            ],
+    async def test_compute_old_score_success(self, score_service: ScoreService, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "REVIEWS_PAGINATION", "offset")
+        monkeypatch.setattr(settings, "REVIEWS_PAGE_SIZE", 4)
+        monkeypatch.setattr(settings, "REVIEWS_FETCH_CONCURRENCY", 2)
+        pages = {0: make_reviews(10, 15, 10, 15), 4: make_reviews(20, 25)}
+        score_service._get_scores = AsyncMock(
+            side_effect=lambda accommodation_id, time_frame, offset, limit: pages.get(offset, []),
         )
 
         score, weight = await score_service.compute_old_score("123e4567-e89b-12d3-a456-426614174000")
 
         assert round(score, 2) == 9.04
         assert weight == log(1.77)
+        assert score_service._get_scores.await_args_list == [
+            call("123e4567-e89b-12d3-a456-426614174000", "older_than_2_years", offset, 4) for offset in (0, 4, 8)
+        ]
+
+    async def test_compute_old_score_walks_pages_by_cursor(self, score_service: ScoreService):
+        pages = {None: (make_reviews(10, 15, 10, 15), "cursor"), "cursor": (make_reviews(20, 25), None)}
+        score_service._get_scores_page = AsyncMock(
+            side_effect=lambda accommodation_id, time_frame, limit, cursor=None: pages[cursor],
+        )
+
+        score, weight = await score_service.compute_old_score("123e4567-e89b-12d3-a456-426614174000")
+
+        assert round(score, 2) == 9.04
+        assert score_service._get_scores_page.await_count == 2
+
+    async def test_get_scores_page_requests_only_score_fields(self, score_service: ScoreService):
+        score_service.client.get_response = AsyncMock(
+            return_value=httpx.Response(200, json=make_reviews(8), headers={"X-Next-Cursor": "next"}),
+        )
+
+        reviews, cursor = await score_service._get_scores_page("123e4567-e89b-12d3-a456-426614174000", "old", 1)
+
+        assert score_service.client.get_response.call_args.kwargs["params"] == {
+            "limit": 1,
+            "status": "approved",
+            "time_frame": "old",
+            "fields": "id,created_at,general_score,score_aspects",
+        }
+        assert len(reviews) == 1
+        assert cursor == "next"
+
+    async def test_compute_new_score_stops_on_not_full_first_page(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "REVIEWS_PAGINATION", "offset")
+        monkeypatch.setattr(settings, "REVIEWS_PAGE_SIZE", 4)
+        reviews = make_reviews(8, 6, created_at=datetime.now(timezone.utc))
+        score_service._get_scores = AsyncMock(return_value=reviews)
+
+        new_scores = await score_service.compute_new_score("123e4567-e89b-12d3-a456-426614174000")
+
+        assert score_service._get_scores.await_count == 1
+        assert new_scores == {0: pytest.approx((log(25) * 14, log(25) * 2))}
+
+    @pytest.mark.parametrize("name", ["REVIEWS_PAGE_SIZE", "REVIEWS_FETCH_CONCURRENCY", "REVIEWS_STREAM_BATCH_SIZE"])
+    def test_reviews_paging_settings_must_be_positive(self, name: str):
+        with pytest.raises(ValidationError):
+            Settings(**{name: 0})
+
+    async def test_compute_old_score_from_stream(self, score_service: ScoreService, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "SCORE_SOURCE", "stream")
+        monkeypatch.setattr(settings, "REVIEWS_STREAM_BATCH_SIZE", 4)
+
+        async def iter_lines(url: str, params: dict):
+            for review in make_reviews(10, 15, 10, 15, 20, 25):
+                yield json.dumps(review)
+
+        score_service.client.iter_lines = iter_lines
+
+        score, weight = await score_service.compute_old_score("123e4567-e89b-12d3-a456-426614174000")
+
+        assert round(score, 2) == 9.04
+
+    async def test_compute_aggregated_score_if_score_not_found(self, score_service: ScoreService):
+        score_service.client.get = AsyncMock(return_value={"old": {"sum": 0, "count": 0}, "new": []})
+
+        with pytest.raises(ScoreNotFoundError, match="Score was not found"):
+            await score_service.compute_aggregated_score("123e4567-e89b-12d3-a456-426614174000")
+
+    async def test_compute_aggregated_score_success(self, score_service: ScoreService):
+        score_service.client.get = AsyncMock(
+            return_value={
+                "old": {"sum": 95, "count": 6},
+                "new": [{"months": 0, "sum": 17, "count": 2}, {"months": 23, "sum": 6, "count": 1}],
+            },
+        )
+
+        (score, weight), new_scores = await score_service.compute_aggregated_score(
+            "123e4567-e89b-12d3-a456-426614174000",
+        )
+
+        assert round(score, 2) == 9.04
+        assert weight == log(1.77)
+        assert new_scores == {0: (log(25) * 17, log(25) * 2), 23: (log(2) * 6, log(2) * 1)}
+
+    async def test_compute_overall_score_from_buckets(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "SCORE_SOURCE", "buckets")
+        score_service.client.get = AsyncMock(
+            return_value={
+                "old": {"sum": 95, "count": 6},
+                "new": [{"months": 0, "sum": 17, "count": 2}, {"months": 23, "sum": 6, "count": 1}],
+            },
+        )
+
+        score = await score_service.compute_overall_score("123e4567-e89b-12d3-a456-426614174000", "food")
+
+        url = score_service.client.get.call_args.args[0]
+        assert url.endswith("/accommodations/123e4567-e89b-12d3-a456-426614174000/reviews/buckets")
+        assert score_service.client.get.call_args.kwargs["params"] == {"status": "approved", "score_aspect": "food"}
+        assert score == {"food": 8.82}
+
+    async def test_compute_all_scores_materialized(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "SCORE_SOURCE", "materialized")
+        score_service.client.get = AsyncMock(
+            return_value={"general_score": 8.5, "score_aspects": {"food": 7.9, "unknown": 1.0}, "computed_at": ""},
+        )
+
+        assert await score_service.compute_all_scores("123e4567-e89b-12d3-a456-426614174000") == {
+            "general_score": 8.5,
+            "food": 7.9,
+        }
+        with pytest.raises(ScoreNotFoundError, match="Score was not found"):
+            await score_service.compute_overall_score("123e4567-e89b-12d3-a456-426614174000", "location")
+
+    async def test_compute_overall_score_materialized_not_found(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "SCORE_SOURCE", "materialized")
+        score_service.client.get = AsyncMock(side_effect=StatusCodeNotOKError("Unexpected return code: 404", 404))
+
+        with pytest.raises(ScoreNotFoundError, match="Score was not found"):
+            await score_service.compute_overall_score("123e4567-e89b-12d3-a456-426614174000")
+
+    @pytest.mark.parametrize("score_engine", ["python", "numpy"])
+    async def test_compute_all_scores_same_as_one_by_one(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+        score_engine: str,
+    ):
+        monkeypatch.setattr(settings, "SCORE_ENGINE", score_engine)
+        old_reviews = make_reviews(10, 15, 10, 15, 20, 25)
+        for old_review, food in zip(old_reviews, (7, 8, 9)):
+            old_review["score_aspects"] = {"food": food}
+        new_reviews = make_reviews(8, 6, 9, created_at=datetime.now(timezone.utc) - timedelta(days=100))
+        for new_review, food in zip(new_reviews, (5, 6)):
+            new_review["score_aspects"] = {"food": food, "pool": 9}
+        score_service._get_scores_page = AsyncMock(
+            side_effect=lambda accommodation_id, time_frame, limit, cursor=None: (
+                old_reviews if time_frame == "older_than_2_years" else new_reviews,
+                None,
+            ),
+        )
+
+        scores = await score_service.compute_all_scores("123e4567-e89b-12d3-a456-426614174000")
+
+        general_score = await score_service.compute_overall_score("123e4567-e89b-12d3-a456-426614174000")
+        food_score = await score_service.compute_overall_score("123e4567-e89b-12d3-a456-426614174000", "food")
+        assert scores == {**general_score, **food_score}
+        assert score_service._get_scores_page.await_count == 6
+
+    async def test_full_validation_gives_same_scores(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        old_reviews = make_reviews(10, 15, 20)
+        old_reviews[0]["score_aspects"] = {"food": 7}
+        new_reviews = make_reviews(8, 6, created_at=datetime.now(timezone.utc) - timedelta(days=100))
+        new_reviews[0]["score_aspects"] = {"food": 5}
+        score_service._get_scores_page = AsyncMock(
+            side_effect=lambda accommodation_id, time_frame, limit, cursor=None: (
+                old_reviews if time_frame == "older_than_2_years" else new_reviews,
+                None,
+            ),
+        )
+
+        scores = await score_service.compute_all_scores("123e4567-e89b-12d3-a456-426614174000")
+        monkeypatch.setattr(settings, "REVIEWS_FULL_VALIDATION", True)
+
+        assert await score_service.compute_all_scores("123e4567-e89b-12d3-a456-426614174000") == scores
+
+    def test_full_validation_rejects_invalid_reviews(self, monkeypatch: pytest.MonkeyPatch):
+        reviews = make_reviews(10)
+        reviews[0]["id"] = "not-an-id"
+        assert ScoreService.get_old_scores(reviews) == [10]
+
+        monkeypatch.setattr(settings, "REVIEWS_FULL_VALIDATION", True)
+        with pytest.raises(ValidationError):
+            ScoreService.get_old_scores(reviews)
+
+    async def test_get_batch_scores_reads_cache_once_and_collects_errors(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        cached_id, computed_id, not_found_id = uuid4(), uuid4(), uuid4()
+        cached_score = dump_cache_item(CacheEntry.build({"general_score": 7.5}, 60))
+        score_service.cache.get_many = AsyncMock(return_value=[cached_score, None, None])
+        score_service.cache.get = AsyncMock(return_value=None)
+
+        async def compute_overall_score(accommodation_id, score_aspect=None):
+            if accommodation_id == not_found_id:
+                raise ScoreNotFoundError("Score was not found")
+            return {"general_score": 8.0}
+
+        score_service.compute_overall_score = compute_overall_score
+
+        scores, errors = await score_service.get_batch_scores([cached_id, computed_id, not_found_id, cached_id])
+
+        assert scores == {cached_id: {"general_score": 7.5}, computed_id: {"general_score": 8.0}}
+        assert errors == {not_found_id: "Score was not found"}
+        cache_keys = [
+            get_value_key(score_service.get_score_cache_key(key)) for key in (cached_id, computed_id, not_found_id)
+        ]
+        score_service.cache.get_many.assert_awaited_once_with(cache_keys)
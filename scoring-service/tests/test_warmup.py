@@ -0,0 +1,122 @@
+from pathlib import Path
+from unittest.mock import AsyncMock, call
+from uuid import UUID, uuid4
+
+import pytest
+
+from src.services import warmup
+from src.services.cache import CacheEntry, get_value_key, load_cache_item
+from src.services.scoring import ScoreNotFoundError, ScoreService
+from src.services.warmup import CacheWarmer, read_hot_list
+
+ACCOMMODATION_ID = UUID("123e4567-e89b-12d3-a456-426614174000")
+
+
+def get_cached_values(score_service: ScoreService) -> dict:
+    values = {}
+    for cache_call in score_service.cache.set.await_args_list:
+        entry = load_cache_item(cache_call.kwargs["value"])
+        assert isinstance(entry, CacheEntry)
+        values[cache_call.kwargs["key"]] = entry.value
+    return values
+
+
+class TestWarmScores:
+    async def test_warm_scores_caches_every_getter(self, score_service: ScoreService):
+        score_service.compute_all_scores = AsyncMock(return_value={"general_score": 8.5, "food": 7.9})
+
+        assert await score_service.warm_scores(ACCOMMODATION_ID) == {"general_score": 8.5, "food": 7.9}
+
+        assert get_cached_values(score_service) == {
+            get_value_key(score_service.get_all_scores.get_cache_key(ACCOMMODATION_ID)): {
+                "general_score": 8.5,
+                "food": 7.9,
+            },
+            get_value_key(score_service.get_general_score.get_cache_key(ACCOMMODATION_ID)): {"general_score": 8.5},
+            get_value_key(score_service.get_score_aspect.get_cache_key(ACCOMMODATION_ID, "food")): {"food": 7.9},
+        }
+        score_service.compute_all_scores.assert_awaited_once_with(ACCOMMODATION_ID)
+
+    async def test_warm_scores_caches_score_not_found(self, score_service: ScoreService):
+        score_service.compute_all_scores = AsyncMock(side_effect=ScoreNotFoundError("Score was not found"))
+
+        with pytest.raises(ScoreNotFoundError):
+            await score_service.warm_scores(ACCOMMODATION_ID)
+
+        cached_values = get_cached_values(score_service)
+        assert set(cached_values) == {
+            get_value_key(score_service.get_all_scores.get_cache_key(ACCOMMODATION_ID)),
+            get_value_key(score_service.get_general_score.get_cache_key(ACCOMMODATION_ID)),
+        }
+        assert all(isinstance(value, ScoreNotFoundError) for value in cached_values.values())
+
+
+class TestCacheWarmer:
+    async def test_iter_accommodation_ids_pages(self, score_service: ScoreService):
+        accommodation_ids = [uuid4() for _ in range(3)]
+        score_service.client.get = AsyncMock(
+            side_effect=[
+                [{"id": str(accommodation_id)} for accommodation_id in accommodation_ids[:2]],
+                [{"id": str(accommodation_ids[2])}],
+            ]
+        )
+        warmer = CacheWarmer(score_service, concurrency=2, rate_limit=0)
+
+        assert [accommodation_id async for accommodation_id in warmer.iter_accommodation_ids(2, "url")] == (
+            accommodation_ids
+        )
+        assert score_service.client.get.await_args_list == [
+            call("url/accommodations", params={"offset": 0, "limit": 2}),
+            call("url/accommodations", params={"offset": 2, "limit": 2}),
+        ]
+
+    async def test_warm_counts_results(self, score_service: ScoreService):
+        accommodation_ids = [uuid4() for _ in range(4)]
+        score_service.warm_scores = AsyncMock(
+            side_effect=[{"general_score": 8.5}, ScoreNotFoundError(), ConnectionError(), {"general_score": 9.0}]
+        )
+        warmer = CacheWarmer(score_service, concurrency=2, rate_limit=0)
+
+        result = await warmer.warm(accommodation_ids)
+
+        assert (result.warmed, result.not_found, result.failed) == (2, 1, 1)
+        assert sorted(args.args[0] for args in score_service.warm_scores.await_args_list) == sorted(accommodation_ids)
+
+    async def test_warm_skips_fresh_scores(self, score_service: ScoreService):
+        accommodation_ids = [uuid4() for _ in range(2)]
+        score_service.has_fresh_scores = AsyncMock(side_effect=[True, False])
+        score_service.warm_scores = AsyncMock(return_value={"general_score": 8.5})
+        warmer = CacheWarmer(score_service, concurrency=1, rate_limit=0)
+
+        result = await warmer.warm(accommodation_ids)
+
+        assert (result.warmed, result.fresh) == (1, 1)
+        score_service.warm_scores.assert_awaited_once_with(accommodation_ids[1])
+
+    async def test_startup_warmup_skipped_if_other_worker_holds_lock(
+        self,
+        score_service: ScoreService,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        warm_cache = AsyncMock()
+        monkeypatch.setattr(warmup, "warm_cache", warm_cache)
+        score_service.cache.acquire_lock.return_value = None
+
+        await warmup.run_startup_warmup(score_service)
+
+        warm_cache.assert_not_awaited()
+        score_service.cache.release_lock.assert_not_awaited()
+
+    async def test_startup_warmup_releases_lock(self, score_service: ScoreService, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(warmup, "warm_cache", AsyncMock(side_effect=ConnectionError()))
+        score_service.cache.acquire_lock.return_value = "token"
+
+        await warmup.run_startup_warmup(score_service)
+
+        score_service.cache.release_lock.assert_awaited_once_with("scoring:v1:warmup:lock", "token")
+
+    def test_read_hot_list(self, tmp_path: Path):
+        hot_list = tmp_path / "hot_list.txt"
+        hot_list.write_text(f"# most viewed\n{ACCOMMODATION_ID}\n\n")
+
+        assert read_hot_list(hot_list) == [ACCOMMODATION_ID]